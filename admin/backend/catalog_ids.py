@@ -0,0 +1,100 @@
+"""id тренеров, услуг и групповых занятий по имени.
+
+Слоты в админке задаются тренером, услугой и занятием по имени или по
+id. Имена и id справочника читаются из БД одним запросом и хранятся в
+процессе, пока справочник не изменится: изменяющие эндпоинты сбрасывают
+его через ``commit_catalog_change``, другие воркеры — по уведомлению
+``CATALOG_CHANNEL``. Имени, которого нет в снимке, справочник
+перечитывается один раз, поэтому записи, добавленные в обход API,
+находятся без сброса. Если имя повторяется, берется запись с
+наименьшим id.
+"""
+
+from typing import NamedTuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from utils.config import settings
+from utils.models import GroupClass, Service, Trainer
+
+CATALOG_MODELS = {
+    "trainers": Trainer,
+    "services": Service,
+    "groups": GroupClass,
+}
+
+
+class CatalogIds(NamedTuple):
+    """Снимок справочника: id по имени и все id"""
+
+    by_name: dict[str, int]
+    ids: frozenset[int]
+
+    def find(self, item_id: int | None, name: str | None) -> int | None:
+        if item_id is not None:
+            return item_id if item_id in self.ids else None
+        return self.by_name.get(name)
+
+
+class CatalogIdCache:
+    """Снимки id справочников процесса.
+
+    Выключенный кэш (``CATALOG_CACHE_ENABLED``) читает справочник на
+    каждый запрос.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._catalogs: dict[str, CatalogIds] = {}
+        self._versions = dict.fromkeys(CATALOG_MODELS, 0)
+
+    async def load(self, session: AsyncSession, name: str) -> CatalogIds:
+        version = self._versions[name]
+        model = CATALOG_MODELS[name]
+        rows = (
+            await session.exec(select(model.name, model.id).order_by(model.id))
+        ).all()
+        by_name = {}
+        for item_name, item_id in rows:
+            by_name.setdefault(item_name, item_id)
+        catalog = CatalogIds(
+            by_name, frozenset(item_id for _, item_id in rows)
+        )
+        # Справочник, изменившийся во время чтения, не сохраняется
+        if self.enabled and version == self._versions[name]:
+            self._catalogs = {**self._catalogs, name: catalog}
+        return catalog
+
+    async def resolve(
+        self,
+        session: AsyncSession,
+        name: str,
+        item_id: int | None = None,
+        item_name: str | None = None,
+    ) -> int | None:
+        """id записи справочника по id или имени, None если ее нет"""
+        catalog = self._catalogs.get(name)
+        if catalog is not None:
+            found = catalog.find(item_id, item_name)
+            if found is not None:
+                return found
+        return (await self.load(session, name)).find(item_id, item_name)
+
+    def invalidate(self, name: str):
+        if name not in self._versions:
+            return
+        self._versions[name] += 1
+        self._catalogs = {
+            key: catalog
+            for key, catalog in self._catalogs.items()
+            if key != name
+        }
+
+    def clear(self):
+        for name in self._versions:
+            self._versions[name] += 1
+        self._catalogs = {}
+
+
+catalog_ids = CatalogIdCache(settings.CATALOG_CACHE_ENABLED)
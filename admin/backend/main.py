@@ -1,47 +1,99 @@
-from contextlib import asynccontextmanager
-import os
+import asyncio
 
-import uvicorn
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 
+from admin.backend.catalog_ids import catalog_ids
+from admin.backend.routes import router as rest_router
+from utils.catalog_cache import (
+    CATALOG_CHANNEL,
+    apply_catalog_change,
+    catalog_cache,
+)
+from utils.compression import CompressionMiddleware
+from utils.config import settings
 from utils.database import db
-from utils.metrics import start_metrics_server_in_thread, track_request, time_request
+from utils.lifecycle import is_managed_worker
+from utils.metrics import (
+    PrometheusMiddleware,
+    cleanup_dead_workers,
+    metrics_endpoint,
+    metrics_registry,
+)
+from utils.notifications import start_listener
+from utils.responses import ORJSONResponse
+
+
+def init_service():
+    """Разовая инициализация сервиса до запуска воркеров"""
+    db.prepare_schema(
+        settings.DB_SCHEMA_MODE, settings.ALEMBIC_SCRIPT_LOCATION
+    )
 
-from admin.backend.routes import router as rest_router
 
+def on_catalog_change(payload: str):
+    """Сброс снимка справочника и id его записей"""
+    apply_catalog_change(payload)
+    catalog_ids.invalidate(payload)
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        path = request.url.path
-        
-        with time_request(method, path):
-            response = await call_next(request)
-            
-        status_code = response.status_code
-        track_request(method, path, status_code)
-        
-        return response
+
+def reset_catalogs():
+    catalog_cache.clear()
+    catalog_ids.clear()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Установка имени сервиса для метрик
-    os.environ['SERVICE_NAME'] = 'admin-backend'
+    metrics_registry.set_service_name('admin-backend')
     
-    # Запуск сервера метрик на порту 8001
-    start_metrics_server_in_thread(port=8001)
+    # Удаление файлов метрик воркеров, завершившихся до старта
+    cleanup_dead_workers()
     
-    db.create_db_and_tables()
+    # Под лаунчером схему один раз готовит мастер-процесс
+    if not is_managed_worker():
+        init_service()
+
+    # Сброс снимков справочников и id их записей по уведомлениям из
+    # других воркеров. Подписка раньше построения снимка: изменения во
+    # время построения не теряются
+    listener = None
+    if catalog_cache.enabled:
+        listener = await start_listener(
+            settings.DATABASE_URL,
+            {CATALOG_CHANNEL: on_catalog_change},
+            on_reset=reset_catalogs,
+        )
+
+    # Снимок справочников строится до приема запросов
+    if catalog_cache.enabled:
+        await catalog_cache.refresh()
     yield
+    if listener is not None:
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+    await catalog_cache.close()
+    await db.dispose()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(rest_router)
 
+# Метрики отдаются самим приложением на /metrics
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Сжатие ответов, время сжатия входит в метрики запроса
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    cache_size=settings.COMPRESSION_CACHE_SIZE,
+)
+
 # Добавление middleware для сбора метрик
 app.add_middleware(PrometheusMiddleware)
 
@@ -51,7 +103,5 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
-
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5000)
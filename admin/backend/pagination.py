@@ -0,0 +1,165 @@
+"""Постраничная выдача админских списков.
+
+Страница — записи после курсора в порядке ключа сортировки (keyset):
+запрос читает из индекса ``limit + 1`` строк на любой глубине списка,
+в отличие от ``OFFSET``. Тело ответа остается массивом записей, курсор
+следующей страницы передается заголовком ``X-Next-Cursor``, а число
+записей — заголовком ``X-Total-Count``, если его запросили
+(``total=exact`` или ``total=estimate``). Оценка берется из плана
+запроса (``EXPLAIN``) и не читает таблицу, поэтому не дорожает с ростом
+числа слотов.
+
+Курсор — base64url от JSON со значениями ключа последней записи
+страницы. ``fields`` ограничивает колонки ответа, колонки ключа
+читаются всегда.
+"""
+
+import base64
+import binascii
+
+from datetime import date, time
+from typing import Literal
+
+import orjson
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.responses import Response
+
+from utils.config import settings
+from utils.responses import dumps, json_response
+
+# Диалект с именованными параметрами для текста EXPLAIN
+EXPLAIN_DIALECT = postgresql.dialect(paramstyle="named")
+
+
+class PageQuery(BaseModel):
+    """Параметры страницы списка"""
+
+    limit: int | None = Field(None, ge=1, le=settings.ADMIN_MAX_PAGE_SIZE)
+    after: str | None = None
+    fields: str | None = None
+    total: Literal["exact", "estimate"] | None = None
+
+    @property
+    def page_size(self) -> int:
+        return self.limit or settings.ADMIN_PAGE_SIZE
+
+    def is_empty(self) -> bool:
+        """Ни один параметр не указан"""
+        return all(value is None for value in self.model_dump().values())
+
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(dumps(list(values))).rstrip(b"=").decode()
+
+
+def parse_key_value(column, value):
+    python_type = column.type.python_type
+    if python_type in (date, time) and isinstance(value, str):
+        return python_type.fromisoformat(value)
+    if python_type is int and type(value) is int:
+        return value
+    raise ValueError(value)
+
+
+def decode_cursor(cursor: str, key) -> list:
+    """Значения ключа из курсора, 400 если курсор неверен"""
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(key):
+            raise ValueError(values)
+        return [
+            parse_key_value(column, value)
+            for column, value in zip(key, values)
+        ]
+    except (binascii.Error, orjson.JSONDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def select_fields(columns: dict, fields: str | None) -> list[str]:
+    """Имена колонок ответа из ``fields``, по умолчанию все"""
+    if not fields:
+        return list(columns)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    for name in names:
+        if name not in columns:
+            raise HTTPException(
+                status_code=400, detail=f"Неизвестное поле '{name}'"
+            )
+    return list(dict.fromkeys(names))
+
+
+async def count_rows(session: AsyncSession, statement, total: str) -> int:
+    """Число строк запроса: точное или оценка планировщика"""
+    if total == "exact":
+        return (
+            await session.exec(
+                select(func.count()).select_from(statement.subquery())
+            )
+        ).one()[0]
+    compiled = statement.compile(dialect=EXPLAIN_DIALECT)
+    plan = (
+        await session.exec(
+            text(f"EXPLAIN (FORMAT JSON) {compiled}"),
+            params=compiled.params,
+        )
+    ).scalar()
+    if isinstance(plan, str):
+        plan = orjson.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def project_page(statement, columns: dict, key_columns, page: PageQuery):
+    """Колонки ответа из ``fields`` и колонки ключа в ``statement``"""
+    names = select_fields(columns, page.fields)
+    return names, statement.with_only_columns(
+        *(columns[name].label(name) for name in names),
+        *(
+            column.label(f"key_{position}")
+            for position, column in enumerate(key_columns)
+        ),
+    )
+
+
+def limit_page(statement, key_columns, page: PageQuery):
+    """Строки после курсора в порядке ключа и одна строка сверх страницы"""
+    if page.after:
+        statement = statement.where(
+            tuple_(*key_columns)
+            > tuple_(*decode_cursor(page.after, key_columns))
+        )
+    return statement.order_by(*key_columns).limit(page.page_size + 1)
+
+
+async def page_response(
+    session: AsyncSession,
+    statement,
+    columns: dict,
+    key_columns: tuple,
+    page: PageQuery,
+) -> Response:
+    """Страница записей ``statement`` по ключу ``key_columns``.
+
+    ``columns`` — колонки ответа по именам, фильтры уже наложены на
+    ``statement``.
+    """
+    names, statement = project_page(statement, columns, key_columns, page)
+    headers = {}
+    if page.total:
+        headers["X-Total-Count"] = str(
+            await count_rows(session, statement, page.total)
+        )
+    rows = (
+        await session.exec(limit_page(statement, key_columns, page))
+    ).all()
+    if len(rows) > page.page_size:
+        rows = rows[: page.page_size]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][len(names) :])
+    return json_response(
+        dumps([dict(zip(names, row)) for row in rows]), headers=headers
+    )
@@ -1,20 +1,89 @@
 from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
-from sqlmodel import Session, select
-
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from admin.backend.catalog_ids import CATALOG_MODELS, catalog_ids
+from admin.backend.pagination import PageQuery, page_response
+from admin.backend.schedule import (
+    MAX_SCHEDULE_DAYS,
+    TimeSlotSchedule,
+    expand_schedule,
+    insert_schedule,
+)
+from admin.backend.timeslots import (
+    TIMESLOT_LIST_COLUMNS,
+    TIMESLOT_LIST_KEY,
+    TimeSlotListQuery,
+    list_timeslots,
+    update_timeslot,
+)
+from utils.availability_cache import SlotChange, notify_slot_changes
+from utils.catalog_cache import (
+    PRIVATE_CACHE_CONTROL,
+    catalog_cache,
+    catalog_response,
+    notify_catalog_change,
+)
 from utils.database import db
 from utils.models import GroupClass, Service, TimeSlot, Trainer
 
-SessionDep = Annotated[Session, Depends(db.get_session)]
+# Код ошибки PostgreSQL: ссылка на несуществующую запись
+FOREIGN_KEY_VIOLATION = "23503"
+
+SessionDep = Annotated[AsyncSession, Depends(db.get_async_session)]
 router = APIRouter()
 
 
+async def commit_catalog_change(session: AsyncSession, name: str):
+    """Фиксация изменения справочника со сбросом его снимков"""
+    await notify_catalog_change(session, name)
+    await session.commit()
+    catalog_cache.invalidate(name)
+    catalog_ids.invalidate(name)
+
+
+class CatalogListQuery(PageQuery):
+    """Страница справочника с поиском по части имени"""
+
+    q: str | None = None
+
+
+async def catalog_list_response(
+    request: Request,
+    session: AsyncSession,
+    name: str,
+    query: CatalogListQuery,
+):
+    """Справочник целиком из снимка или страница из БД с параметрами"""
+    if query.is_empty():
+        return await catalog_response(request, name, PRIVATE_CACHE_CONTROL)
+    model = CATALOG_MODELS[name]
+    columns = {column.name: column for column in model.__table__.columns}
+    statement = select(*columns.values())
+    if query.q:
+        statement = statement.where(model.name.icontains(query.q))
+    return await page_response(
+        session,
+        statement,
+        columns,
+        (model.id,),
+        query,
+    )
+
+
 class TimeSlotRequest(BaseModel):
-    trainer_name: str
+    """Слот с тренером, услугой и занятием по id или по имени"""
+
+    trainer_id: int | None = None
+    trainer_name: str | None = None
+    service_id: int | None = None
     service_name: str | None = None
+    group_id: int | None = None
     group_name: str | None = None
     date: str
     time: str
@@ -22,16 +91,84 @@ class TimeSlotRequest(BaseModel):
     available_spots: int
 
 
+async def resolve_catalog_id(
+    session: AsyncSession,
+    name: str,
+    item_id: int | None,
+    item_name: str | None,
+    detail: str,
+) -> int | None:
+    """id записи справочника, None если не указана, 400 если ее нет"""
+    if item_id is None and not item_name:
+        return None
+    found = await catalog_ids.resolve(session, name, item_id, item_name)
+    if found is None:
+        label = item_name if item_id is None else item_id
+        raise HTTPException(status_code=400, detail=detail.format(label))
+    return found
+
+
+async def timeslot_from_request(
+    session: AsyncSession, data: TimeSlotRequest
+) -> TimeSlot:
+    """Слот из запроса с id тренера, услуги и занятия"""
+    if data.trainer_id is None and not data.trainer_name:
+        raise HTTPException(status_code=400, detail="Укажите тренера")
+    return TimeSlot(
+        trainer_id=await resolve_catalog_id(
+            session,
+            "trainers",
+            data.trainer_id,
+            data.trainer_name,
+            "Тренер '{}' не найден",
+        ),
+        service_id=await resolve_catalog_id(
+            session,
+            "services",
+            data.service_id,
+            data.service_name,
+            "Услуга '{}' не найдена",
+        ),
+        group_class_id=await resolve_catalog_id(
+            session,
+            "groups",
+            data.group_id,
+            data.group_name,
+            "Групповое занятие '{}' не найдено",
+        ),
+        dates=datetime.strptime(data.date, "%Y-%m-%d").date(),
+        times=datetime.strptime(data.time, "%H:%M").time(),
+        available=data.status,
+        available_spots=data.available_spots,
+    )
+
+
+def timeslot_conflict(error: IntegrityError) -> HTTPException:
+    """Ответ на нарушение ограничения при записи слота"""
+    if getattr(error.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION:
+        # Запись справочника удалили после того, как ее id попал в снимок
+        catalog_ids.clear()
+        return HTTPException(
+            status_code=400,
+            detail="Тренер, услуга или групповое занятие не найдены",
+        )
+    return HTTPException(
+        status_code=400, detail="Такой временной слот уже существует"
+    )
+
+
 @router.get("/api/admin/trainers")
-async def get_trainers_endpoint(session: SessionDep):
-    return session.exec(select(Trainer)).all()
+async def get_trainers_endpoint(
+    request: Request,
+    session: SessionDep,
+    query: Annotated[CatalogListQuery, Query()],
+):
+    return await catalog_list_response(request, session, "trainers", query)
 
 
 @router.get("/api/admin/trainer/{trainer_id}")
-async def get_trainer_endpoint(
-    trainer_id: int, session: Session = Depends(db.get_session)
-):
-    trainer = session.get(Trainer, trainer_id)
+async def get_trainer_endpoint(trainer_id: int, session: SessionDep):
+    trainer = await session.get(Trainer, trainer_id)
     if not trainer:
         raise HTTPException(status_code=404, detail="Тренер не найден")
     return trainer
@@ -44,10 +181,12 @@ async def add_trainer_endpoint(session: SessionDep, trainer: Trainer):
             raise HTTPException(
                 status_code=400, detail="Имя и Специализация обязательны"
             )
-        existing_trainer = session.exec(
-            select(Trainer).where(
-                Trainer.name == trainer.name,
-                Trainer.specialization == trainer.specialization,
+        existing_trainer = (
+            await session.exec(
+                select(Trainer).where(
+                    Trainer.name == trainer.name,
+                    Trainer.specialization == trainer.specialization,
+                )
             )
         ).first()
         if existing_trainer:
@@ -55,24 +194,24 @@ async def add_trainer_endpoint(session: SessionDep, trainer: Trainer):
                 status_code=400, detail="Тренер уже существует"
             )
         session.add(trainer)
-        session.commit()
-        session.refresh(trainer)
+        await commit_catalog_change(session, "trainers")
+        await session.refresh(trainer)
         return {"trainer_id": trainer.id}
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.delete("/api/admin/trainer/delete/{trainer_id}")
 async def delete_trainer_endpoint(session: SessionDep, trainer_id: int):
     try:
-        trainer = session.get(Trainer, trainer_id)
+        trainer = await session.get(Trainer, trainer_id)
         if not trainer:
             raise HTTPException(status_code=404, detail="Тренер не найден")
-        session.delete(trainer)
-        session.commit()
+        await session.delete(trainer)
+        await commit_catalog_change(session, "trainers")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -81,7 +220,7 @@ async def edit_trainer_endpoint(
     session: SessionDep, trainer_id: int, trainer_data: Trainer
 ):
     try:
-        trainer = session.get(Trainer, trainer_id)
+        trainer = await session.get(Trainer, trainer_id)
         if not trainer:
             raise HTTPException(status_code=404, detail="Тренер не найден")
 
@@ -89,23 +228,24 @@ async def edit_trainer_endpoint(
         trainer.description = trainer_data.description
         trainer.specialization = trainer_data.specialization
         trainer.photo = trainer_data.photo
-        session.commit()
+        await commit_catalog_change(session, "trainers")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.get("/api/admin/services")
-async def return_services_endpoint(session: SessionDep):
-    services = session.exec(select(Service)).all()
-    return services
+async def return_services_endpoint(
+    request: Request,
+    session: SessionDep,
+    query: Annotated[CatalogListQuery, Query()],
+):
+    return await catalog_list_response(request, session, "services", query)
 
 
 @router.get("/api/admin/service/{service_id}")
-async def get_service_endpoint(
-    service_id: int, session: Session = Depends(db.get_session)
-):
-    service = session.get(Service, service_id)
+async def get_service_endpoint(service_id: int, session: SessionDep):
+    service = await session.get(Service, service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Сервис не найден")
     return service
@@ -118,9 +258,11 @@ async def add_service_endpoint(session: SessionDep, service: Service):
             raise HTTPException(
                 status_code=400, detail="Название и тип обязательны"
             )
-        existing_service = session.exec(
-            select(Service).where(
-                Service.name == service.name, Service.type == service.type
+        existing_service = (
+            await session.exec(
+                select(Service).where(
+                    Service.name == service.name, Service.type == service.type
+                )
             )
         ).first()
         if existing_service:
@@ -128,24 +270,24 @@ async def add_service_endpoint(session: SessionDep, service: Service):
                 status_code=400, detail="Сервис уже существует"
             )
         session.add(service)
-        session.commit()
-        session.refresh(service)
+        await commit_catalog_change(session, "services")
+        await session.refresh(service)
         return {"service_id": service.id}
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.delete("/api/admin/service/delete/{service_id}")
 async def delete_service_endpoint(session: SessionDep, service_id: int):
     try:
-        service = session.get(Service, service_id)
+        service = await session.get(Service, service_id)
         if not service:
             raise HTTPException(status_code=404, detail="Сервис не найден")
-        session.delete(service)
-        session.commit()
+        await session.delete(service)
+        await commit_catalog_change(session, "services")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -154,7 +296,7 @@ async def edit_service_endpoint(
     session: SessionDep, service_id: int, service_data: Service
 ):
     try:
-        service = session.get(Service, service_id)
+        service = await session.get(Service, service_id)
         if not service:
             raise HTTPException(status_code=404, detail="Сервис не найден")
 
@@ -164,23 +306,24 @@ async def edit_service_endpoint(
         service.price = service_data.price
         service.photo = service_data.photo
         service.type = service_data.type
-        session.commit()
+        await commit_catalog_change(session, "services")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.get("/api/admin/groups")
-async def return_groups_endpoint(session: SessionDep):
-    groups = session.exec(select(GroupClass)).all()
-    return groups
+async def return_groups_endpoint(
+    request: Request,
+    session: SessionDep,
+    query: Annotated[CatalogListQuery, Query()],
+):
+    return await catalog_list_response(request, session, "groups", query)
 
 
 @router.get("/api/admin/group/{group_id}")
-async def get_group_endpoint(
-    group_id: int, session: Session = Depends(db.get_session)
-):
-    group = session.get(GroupClass, group_id)
+async def get_group_endpoint(group_id: int, session: SessionDep):
+    group = await session.get(GroupClass, group_id)
     if not group:
         raise HTTPException(
             status_code=404, detail="Групповое занятие не найдено"
@@ -195,34 +338,36 @@ async def add_group_endpoint(session: SessionDep, group: GroupClass):
             raise HTTPException(
                 status_code=400, detail="Название является обязательным"
             )
-        existing_group = session.exec(
-            select(GroupClass).where(GroupClass.name == group.name)
+        existing_group = (
+            await session.exec(
+                select(GroupClass).where(GroupClass.name == group.name)
+            )
         ).first()
         if existing_group:
             raise HTTPException(
                 status_code=400, detail="Групповое занятие уже существует"
             )
         session.add(group)
-        session.commit()
-        session.refresh(group)
+        await commit_catalog_change(session, "groups")
+        await session.refresh(group)
         return {"group_id": group.id}
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.delete("/api/admin/group/delete/{group_id}")
 async def delete_group_endpoint(session: SessionDep, group_id: int):
     try:
-        group = session.get(GroupClass, group_id)
+        group = await session.get(GroupClass, group_id)
         if not group:
             raise HTTPException(
                 status_code=404, detail="Групповое занятие не найдено"
             )
-        session.delete(group)
-        session.commit()
+        await session.delete(group)
+        await commit_catalog_change(session, "groups")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -231,7 +376,7 @@ async def edit_group_endpoint(
     session: SessionDep, group_id: int, group_data: GroupClass
 ):
     try:
-        group = session.get(GroupClass, group_id)
+        group = await session.get(GroupClass, group_id)
         if not group:
             raise HTTPException(
                 status_code=404, detail="Групповое занятие не найдено"
@@ -241,63 +386,28 @@ async def edit_group_endpoint(
         group.duration = group_data.duration
         group.description = group_data.description
         group.price = group_data.price
-        session.commit()
+        await commit_catalog_change(session, "groups")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
 @router.get("/api/admin/times")
 async def return_timeslots_endpoint(
-    session: SessionDep,
-    trainer_id: int = Query(..., description="ID тренера"),
-    date: str = Query(..., description="Дата записи"),
+    session: SessionDep, query: Annotated[TimeSlotListQuery, Query()]
 ):
-    query = (
-        select(
-            TimeSlot.id.label("timeslot_id"),
-            Trainer.name.label("trainer_name"),
-            Service.name.label("service_name"),
-            GroupClass.name.label("group_name"),
-            TimeSlot.dates.label("date"),
-            TimeSlot.times.label("time"),
-            TimeSlot.available.label("status"),
-            TimeSlot.available_spots.label("available_spots"),
-        )
-        .join(Trainer, TimeSlot.trainer_id == Trainer.id)
-        .join(Service, TimeSlot.service_id == Service.id, isouter=True)
-        .join(
-            GroupClass, TimeSlot.group_class_id == GroupClass.id, isouter=True
-        )
+    return await page_response(
+        session,
+        list_timeslots(query),
+        TIMESLOT_LIST_COLUMNS,
+        TIMESLOT_LIST_KEY,
+        query,
     )
 
-    if trainer_id:
-        query = query.where(TimeSlot.trainer_id == trainer_id)
-    if date:
-        query = query.where(TimeSlot.dates == date)
-
-    time_slots = session.exec(query).all()
-
-    return [
-        {
-            "timeslot_id": ts.timeslot_id,
-            "trainer_name": ts.trainer_name or "Тренер не указан",
-            "service_name": ts.service_name or None,
-            "group_name": ts.group_name or None,
-            "date": ts.date if ts.date else "Дата не указана",
-            "time": ts.time if ts.time else "Время не указано",
-            "status": ts.status or False,
-            "available_spots": ts.available_spots or 0,
-        }
-        for ts in time_slots
-    ]
-
 
 @router.get("/api/admin/time/{time_id}")
-async def get_time_endpoint(
-    time_id: int, session: Session = Depends(db.get_session)
-):
-    time = session.get(TimeSlot, time_id)
+async def get_time_endpoint(time_id: int, session: SessionDep):
+    time = await session.get(TimeSlot, time_id)
     if not time:
         raise HTTPException(status_code=404, detail="Временной слот не найден")
     return time
@@ -306,76 +416,102 @@ async def get_time_endpoint(
 @router.post("/api/admin/time/add")
 async def add_time_endpoint(session: SessionDep, time: TimeSlotRequest):
     try:
-        dates = datetime.strptime(time.date, "%Y-%m-%d").date()
-        times = datetime.strptime(time.time, "%H:%M").time()
-
-        trainer = session.exec(
-            select(Trainer).where(Trainer.name == time.trainer_name)
-        ).first()
-        if not trainer:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Тренер '{time.trainer_name}' не найден",
-            )
-
-        service = None
-        if time.service_name:
-            service = session.exec(
-                select(Service).where(Service.name == time.service_name)
-            ).first()
-            if not service:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Услуга '{time.service_name}' не найдена",
-                )
-
-        group_class = None
-        if time.group_name:
-            group_class = session.exec(
-                select(GroupClass).where(GroupClass.name == time.group_name)
-            ).first()
-            if not group_class:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Групповое занятие '{time.group_name}' не найдено",
-                )
-
-        new_time_slot = TimeSlot(
-            trainer_id=trainer.id,
-            service_id=service.id if service else None,
-            group_class_id=group_class.id if group_class else None,
-            dates=dates,
-            times=times,
-            available=time.status,
-            available_spots=time.available_spots,
-        )
+        new_time_slot = await timeslot_from_request(session, time)
 
         session.add(new_time_slot)
-        session.commit()
-        session.refresh(new_time_slot)
+        await notify_slot_changes(session, [SlotChange.of(new_time_slot)])
+        await session.commit()
+        await session.refresh(new_time_slot)
 
         return {
             "message": "Временной слот успешно добавлен",
             "time_slot": new_time_slot,
         }
 
+    except IntegrityError as e:
+        await session.rollback()
+        raise timeslot_conflict(e)
+    except Exception as e:
+        await session.rollback()
+        raise e
+
+
+@router.post("/api/admin/time/bulk")
+async def add_time_schedule_endpoint(
+    session: SessionDep, schedule: TimeSlotSchedule
+):
+    """Слоты по правилу повторения одним запросом, существующие пропускаются"""
+    if (schedule.service_id is None) == (schedule.group_class_id is None):
+        raise HTTPException(
+            status_code=400, detail="Укажите услугу или групповое занятие"
+        )
+    days = (schedule.date_to - schedule.date_from).days
+    if not 0 <= days < MAX_SCHEDULE_DAYS:
+        raise HTTPException(status_code=400, detail="Некорректный период")
+    if not schedule.weekdays <= set(range(7)):
+        raise HTTPException(
+            status_code=400, detail="Дни недели задаются числами от 0 до 6"
+        )
+    if schedule.group_class_id is not None and not schedule.available_spots:
+        raise HTTPException(
+            status_code=400, detail="Укажите число мест в группе"
+        )
+
+    try:
+        if not await session.get(Trainer, schedule.trainer_id):
+            raise HTTPException(status_code=400, detail="Тренер не найден")
+        if schedule.service_id is not None and not await session.get(
+            Service, schedule.service_id
+        ):
+            raise HTTPException(status_code=400, detail="Услуга не найдена")
+        if schedule.group_class_id is not None and not await session.get(
+            GroupClass, schedule.group_class_id
+        ):
+            raise HTTPException(
+                status_code=400, detail="Групповое занятие не найдено"
+            )
+
+        slots = expand_schedule(schedule)
+        statement, params = insert_schedule(schedule, slots)
+        created = (await session.exec(statement, params=params)).scalars()
+        created_dates = created.all()
+        await notify_slot_changes(
+            session,
+            (
+                SlotChange(
+                    schedule.service_id,
+                    schedule.group_class_id,
+                    schedule.trainer_id,
+                    day,
+                )
+                for day in sorted(set(created_dates))
+            ),
+        )
+        await session.commit()
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
+    return {
+        "message": "Временные слоты успешно добавлены",
+        "created": len(created_dates),
+        "skipped": len(slots) - len(created_dates),
+    }
+
 
 @router.delete("/api/admin/time/delete/{time_id}")
 async def delete_time_endpoint(session: SessionDep, time_id: int):
     try:
-        time = session.get(TimeSlot, time_id)
+        time = await session.get(TimeSlot, time_id)
         if not time:
             raise HTTPException(
                 status_code=404, detail="Временной слот не найден"
             )
-        session.delete(time)
-        session.commit()
+        await session.delete(time)
+        await notify_slot_changes(session, [SlotChange.of(time)])
+        await session.commit()
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -384,59 +520,20 @@ async def edit_time_endpoint(
     session: SessionDep, time_id: int, time_data: TimeSlotRequest
 ):
     try:
-        time = session.get(TimeSlot, time_id)
-        if not time:
+        time = await timeslot_from_request(session, time_data)
+        statement, params = update_timeslot(time_id, time)
+        previous = (await session.exec(statement, params=params)).first()
+        if not previous:
             raise HTTPException(
                 status_code=404, detail="Временной слот не найден"
             )
-
-        time_data.date = datetime.strptime(time_data.date, "%Y-%m-%d").date()
-        time_data.time = datetime.strptime(
-            time_data.time + ":00", "%H:%M:%S"
-        ).time()
-
-        trainer = session.exec(
-            select(Trainer).where(Trainer.name == time_data.trainer_name)
-        ).first()
-        if not trainer:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Тренер '{time_data.trainer_name}' не найден",
-            )
-
-        service = None
-        if time_data.service_name:
-            service = session.exec(
-                select(Service).where(Service.name == time_data.service_name)
-            ).first()
-            if not service:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Услуга '{time_data.service_name}' не найдена",
-                )
-
-        group_class = None
-        if time_data.group_name:
-            group_class = session.exec(
-                select(GroupClass).where(
-                    GroupClass.name == time_data.group_name
-                )
-            ).first()
-            if not group_class:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Групповое занятие '{time_data.group_name}'"
-                    f"не найдено",
-                )
-
-        time.trainer_id = trainer.id
-        time.service_id = service.id if service else None
-        time.group_class_id = group_class.id if group_class else None
-        time.dates = time_data.date
-        time.times = time_data.time
-        time.available = time_data.status
-        time.available_spots = time_data.available_spots
-        session.commit()
+        await notify_slot_changes(
+            session, [SlotChange.of(previous), SlotChange.of(time)]
+        )
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise timeslot_conflict(e)
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise e
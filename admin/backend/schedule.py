@@ -0,0 +1,108 @@
+"""Массовое создание слотов по правилу повторения.
+
+Правило (дни недели, времена, период) разворачивается в пары дата-время
+на стороне сервера, а слоты вставляются одним ``INSERT ... SELECT FROM
+unnest(...) ON CONFLICT DO NOTHING``: два массива вместо параметров на
+каждую строку, поэтому выражение собирается один раз и не упирается в
+ограничение числа параметров запроса. Слоты, которые уже есть
+(уникальный индекс ``uq_timeslot_trainer_date_time_target``),
+пропускаются.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from pydantic import BaseModel, Field
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Integer,
+    Time,
+    bindparam,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from utils.models import TimeSlot
+
+timeslot_table = TimeSlot.__table__
+
+# Наибольший период одного правила
+MAX_SCHEDULE_DAYS = 366
+
+
+class TimeSlotSchedule(BaseModel):
+    """Слоты тренера по дням недели (0 — понедельник) и временам"""
+
+    trainer_id: int
+    service_id: int | None = None
+    group_class_id: int | None = None
+    date_from: date
+    date_to: date
+    weekdays: set[int] = Field(min_length=1)
+    times: set[time] = Field(min_length=1)
+    available_spots: int | None = None
+    status: bool = True
+
+
+# Пары дата-время, развернутые из правила
+SLOT_DATETIMES = (
+    func.unnest(
+        bindparam("slot_dates", type_=ARRAY(Date)),
+        bindparam("slot_times", type_=ARRAY(Time)),
+    )
+    .table_valued("slot_date", "slot_time")
+    .render_derived(name="slot")
+)
+
+# Колонки слота: параметр выражения или колонка из unnest
+SLOT_VALUES = {
+    "trainer_id": bindparam("slot_trainer_id", type_=Integer),
+    "service_id": bindparam("slot_service_id", type_=Integer),
+    "group_class_id": bindparam("slot_group_class_id", type_=Integer),
+    "dates": SLOT_DATETIMES.c.slot_date,
+    "times": SLOT_DATETIMES.c.slot_time,
+    "available": bindparam("slot_available", type_=Boolean),
+    "available_spots": bindparam("slot_available_spots", type_=Integer),
+    "created_at": bindparam("slot_created_at", type_=DateTime),
+}
+
+INSERT_SCHEDULE = (
+    insert(timeslot_table)
+    .from_select(
+        list(SLOT_VALUES),
+        select(*SLOT_VALUES.values()).select_from(SLOT_DATETIMES),
+    )
+    .on_conflict_do_nothing()
+    .returning(timeslot_table.c.dates)
+)
+
+
+def expand_schedule(schedule: TimeSlotSchedule) -> list[tuple[date, time]]:
+    """Пары дата-время правила в порядке дат"""
+    days = (schedule.date_to - schedule.date_from).days + 1
+    times = sorted(schedule.times)
+    return [
+        (day, slot_time)
+        for day in (
+            schedule.date_from + timedelta(days=offset)
+            for offset in range(days)
+        )
+        if day.weekday() in schedule.weekdays
+        for slot_time in times
+    ]
+
+
+def insert_schedule(schedule: TimeSlotSchedule, slots):
+    """Выражение вставки слотов ``slots`` и его параметры"""
+    return INSERT_SCHEDULE, {
+        "slot_trainer_id": schedule.trainer_id,
+        "slot_service_id": schedule.service_id,
+        "slot_group_class_id": schedule.group_class_id,
+        "slot_available": schedule.status,
+        "slot_available_spots": schedule.available_spots,
+        "slot_created_at": datetime.utcnow(),
+        "slot_dates": [day for day, _ in slots],
+        "slot_times": [slot_time for _, slot_time in slots],
+    }
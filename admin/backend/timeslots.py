@@ -0,0 +1,137 @@
+"""Список слотов админки и изменение слота одним запросом.
+
+Список отдается страницами по ключу ``(dates, times, id)``
+(см. ``admin.backend.pagination``) с фильтрами по тренеру, услуге,
+занятию, периоду и доступности.
+
+``UPDATE ... FROM`` блокирует слот, записывает новые значения и
+возвращает прежнее положение слота (``RETURNING``), которое нужно для
+сброса кэша доступности, без отдельного чтения слота перед изменением.
+"""
+
+from datetime import date
+
+from sqlalchemy import (
+    Boolean,
+    Date,
+    Integer,
+    Time,
+    bindparam,
+    func,
+    select,
+    update,
+)
+
+from admin.backend.pagination import PageQuery
+from utils.models import GroupClass, Service, TimeSlot, Trainer
+
+timeslot_table = TimeSlot.__table__
+
+# Колонки списка слотов по именам полей ответа
+TIMESLOT_LIST_COLUMNS = {
+    "timeslot_id": TimeSlot.id,
+    "trainer_id": TimeSlot.trainer_id,
+    "trainer_name": Trainer.name,
+    "service_id": TimeSlot.service_id,
+    "service_name": Service.name,
+    "group_id": TimeSlot.group_class_id,
+    "group_name": GroupClass.name,
+    "date": TimeSlot.dates,
+    "time": TimeSlot.times,
+    "status": TimeSlot.available,
+    "available_spots": func.coalesce(TimeSlot.available_spots, 0),
+}
+TIMESLOT_LIST_KEY = (TimeSlot.dates, TimeSlot.times, TimeSlot.id)
+
+# Все соединения внешние: Postgres убирает из плана те, чьи колонки не
+# запрошены (fields)
+TIMESLOT_LIST_QUERY = (
+    select(TimeSlot.id)
+    .join(Trainer, TimeSlot.trainer_id == Trainer.id, isouter=True)
+    .join(Service, TimeSlot.service_id == Service.id, isouter=True)
+    .join(GroupClass, TimeSlot.group_class_id == GroupClass.id, isouter=True)
+)
+
+
+# Поле ``date`` закрыло бы в теле класса тип date
+DateFilter = date | None
+
+
+class TimeSlotListQuery(PageQuery):
+    """Страница списка слотов с фильтрами"""
+
+    trainer_id: int | None = None
+    service_id: int | None = None
+    group_id: int | None = None
+    available: bool | None = None
+    date_from: DateFilter = None
+    date_to: DateFilter = None
+    date: DateFilter = None
+
+
+def list_timeslots(query: TimeSlotListQuery):
+    """Запрос списка слотов с фильтрами ``query``"""
+    statement = TIMESLOT_LIST_QUERY
+    for column, value in (
+        (TimeSlot.trainer_id, query.trainer_id),
+        (TimeSlot.service_id, query.service_id),
+        (TimeSlot.group_class_id, query.group_id),
+        (TimeSlot.dates, query.date),
+        (TimeSlot.available, query.available),
+    ):
+        if value is not None:
+            statement = statement.where(column == value)
+    if query.date_from is not None:
+        statement = statement.where(TimeSlot.dates >= query.date_from)
+    if query.date_to is not None:
+        statement = statement.where(TimeSlot.dates <= query.date_to)
+    return statement
+
+
+# Прежнее положение слота, заблокированного до конца транзакции
+PREVIOUS_SLOT = (
+    select(
+        timeslot_table.c.id,
+        timeslot_table.c.service_id,
+        timeslot_table.c.group_class_id,
+        timeslot_table.c.trainer_id,
+        timeslot_table.c.dates,
+    )
+    .where(timeslot_table.c.id == bindparam("slot_id", type_=Integer))
+    .with_for_update()
+    .subquery("previous")
+)
+
+UPDATE_TIMESLOT = (
+    update(timeslot_table)
+    .where(timeslot_table.c.id == PREVIOUS_SLOT.c.id)
+    .values(
+        trainer_id=bindparam("slot_trainer_id", type_=Integer),
+        service_id=bindparam("slot_service_id", type_=Integer),
+        group_class_id=bindparam("slot_group_class_id", type_=Integer),
+        dates=bindparam("slot_dates", type_=Date),
+        times=bindparam("slot_times", type_=Time),
+        available=bindparam("slot_available", type_=Boolean),
+        available_spots=bindparam("slot_available_spots", type_=Integer),
+    )
+    .returning(
+        PREVIOUS_SLOT.c.service_id,
+        PREVIOUS_SLOT.c.group_class_id,
+        PREVIOUS_SLOT.c.trainer_id,
+        PREVIOUS_SLOT.c.dates,
+    )
+)
+
+
+def update_timeslot(slot_id: int, slot):
+    """Выражение изменения слота значениями ``slot`` и его параметры"""
+    return UPDATE_TIMESLOT, {
+        "slot_id": slot_id,
+        "slot_trainer_id": slot.trainer_id,
+        "slot_service_id": slot.service_id,
+        "slot_group_class_id": slot.group_class_id,
+        "slot_dates": slot.dates,
+        "slot_times": slot.times,
+        "slot_available": slot.available,
+        "slot_available_spots": slot.available_spots,
+    }
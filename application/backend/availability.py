@@ -0,0 +1,248 @@
+"""Запросы свободных для записи слотов.
+
+Слот доступен для записи, если он открыт (``available``) и не в прошлом,
+у группового слота дополнительно должны оставаться места. Условие на
+``available`` строится самой колонкой, а не ``is True``/``IS TRUE``: так
+оно попадает в SQL и совпадает с предикатом частичных индексов
+``WHERE available``.
+
+Выражения собираются один раз при импорте с ``bindparam`` вместо
+значений, а на запрос к ним только подставляются параметры через
+``.params()``. Ключ кэша компиляции SQLAlchemy у таких выражений один и
+тот же, поэтому SQL компилируется один раз на процесс.
+"""
+
+from datetime import date
+from functools import cache
+
+from sqlalchemy import Date, bindparam
+from sqlmodel import select
+
+from utils.models import GroupClass, TimeSlot, Trainer
+
+TODAY = bindparam("today", type_=Date)
+SLOT_DATE = bindparam("slot_date", type_=Date)
+
+# Наибольший период для запроса слотов диапазоном
+MAX_RANGE_DAYS = 62
+
+
+def bookable_slot():
+    """Условия открытого слота не в прошлом"""
+    return (TimeSlot.available, TimeSlot.dates >= TODAY)
+
+
+def bookable_group_slot():
+    """Условия открытого группового слота со свободными местами"""
+    return (*bookable_slot(), TimeSlot.available_spots > 0)
+
+
+# Колонки таблиц вместо ORM-сущностей: строки сериализуются напрямую
+TIMESLOT_COLUMNS = tuple(TimeSlot.__table__.columns)
+TRAINER_COLUMNS = tuple(Trainer.__table__.columns)
+
+TIMESLOTS_QUERY = select(*TIMESLOT_COLUMNS).where(
+    TimeSlot.trainer_id == bindparam("trainer_id"),
+    TimeSlot.dates == SLOT_DATE,
+    TimeSlot.service_id == bindparam("service_id"),
+    *bookable_slot(),
+)
+
+GROUP_CLASSES_QUERY = (
+    select(
+        TimeSlot.id,
+        TimeSlot.trainer_id,
+        TimeSlot.group_class_id,
+        TimeSlot.dates,
+        TimeSlot.times,
+        TimeSlot.available,
+        TimeSlot.available_spots,
+        TimeSlot.created_at,
+        GroupClass.name.label("class_name"),
+        GroupClass.duration.label("class_duration"),
+        GroupClass.description.label("class_description"),
+        GroupClass.price.label("class_price"),
+        Trainer.name.label("trainer_name"),
+        Trainer.description.label("trainer_description"),
+        Trainer.photo.label("trainer_photo"),
+    )
+    .join(GroupClass, TimeSlot.group_class_id == GroupClass.id)
+    .join(Trainer, Trainer.id == TimeSlot.trainer_id)
+    .where(TimeSlot.dates == SLOT_DATE, *bookable_group_slot())
+    .order_by(TimeSlot.dates, TimeSlot.times)
+)
+
+
+@cache
+def trainers_query(by_service: bool, by_group_class: bool):
+    """Тренеры со свободными слотами, вариант на каждый набор фильтров"""
+    filters = [*bookable_slot()]
+    if by_service:
+        filters.append(TimeSlot.service_id == bindparam("service_id"))
+    if by_group_class:
+        filters.append(
+            TimeSlot.group_class_id == bindparam("group_class_id")
+        )
+    return (
+        select(*TRAINER_COLUMNS)
+        .join(TimeSlot, TimeSlot.trainer_id == Trainer.id)
+        .where(*filters)
+        .distinct()
+    )
+
+
+def bookable_trainers(
+    service_id: int | None, group_class_id: int | None, today: date
+):
+    return trainers_query(bool(service_id), bool(group_class_id)).params(
+        service_id=service_id, group_class_id=group_class_id, today=today
+    )
+
+
+def bookable_timeslots(
+    trainer_id: int, service_id: int, slot_date: date, today: date
+):
+    return TIMESLOTS_QUERY.params(
+        trainer_id=trainer_id,
+        service_id=service_id,
+        slot_date=slot_date,
+        today=today,
+    )
+
+
+def bookable_group_classes(slot_date: date, today: date):
+    return GROUP_CLASSES_QUERY.params(slot_date=slot_date, today=today)
+
+
+def group_class_of(row) -> dict:
+    return {
+        "id": row.group_class_id,
+        "name": row.class_name,
+        "duration": row.class_duration,
+        "description": row.class_description,
+        "price": row.class_price,
+    }
+
+
+def trainer_of(row) -> dict:
+    return {
+        "id": row.trainer_id,
+        "name": row.trainer_name,
+        "description": row.trainer_description,
+        "photo": row.trainer_photo,
+    }
+
+
+def to_group_class_rows(rows) -> list[dict]:
+    """Групповые занятия строками (занятие, тренер, слот)"""
+    return [
+        {
+            "GroupClass": group_class_of(row),
+            "Trainer": trainer_of(row),
+            "TimeSlot": {
+                "id": row.id,
+                "trainer_id": row.trainer_id,
+                "date": row.dates,
+                "times": row.times,
+                "available": row.available,
+                "available_spots": row.available_spots,
+                "created_at": row.created_at,
+            },
+        }
+        for row in rows
+    ]
+
+
+def to_normalized_group_classes(rows) -> dict:
+    """Групповые занятия без повторов: занятия и тренеры по id и слоты.
+
+    Описания занятия и тренера попадают в ответ один раз, сколько бы
+    слотов у них ни было.
+    """
+    classes, trainers, slots = {}, {}, []
+    for row in rows:
+        if row.group_class_id not in classes:
+            classes[row.group_class_id] = group_class_of(row)
+        if row.trainer_id not in trainers:
+            trainers[row.trainer_id] = trainer_of(row)
+        slots.append(
+            {
+                "id": row.id,
+                "classId": row.group_class_id,
+                "trainerId": row.trainer_id,
+                "date": row.dates,
+                "times": row.times,
+                "availableSpots": row.available_spots,
+            }
+        )
+    return {"classes": classes, "trainers": trainers, "slots": slots}
+
+
+@cache
+def range_query(by_group_class: bool, by_trainers: bool):
+    """Слоты периода одним запросом, сгруппированные сортировкой"""
+    if by_group_class:
+        filters = [
+            TimeSlot.group_class_id == bindparam("group_class_id"),
+            *bookable_group_slot(),
+        ]
+    else:
+        filters = [
+            TimeSlot.service_id == bindparam("service_id"),
+            *bookable_slot(),
+        ]
+    if by_trainers:
+        filters.append(
+            TimeSlot.trainer_id.in_(bindparam("trainer_ids", expanding=True))
+        )
+    return (
+        select(
+            TimeSlot.dates,
+            TimeSlot.trainer_id,
+            TimeSlot.id,
+            TimeSlot.times,
+            TimeSlot.available_spots,
+        )
+        .where(
+            TimeSlot.dates >= bindparam("date_from", type_=Date),
+            TimeSlot.dates <= bindparam("date_to", type_=Date),
+            *filters,
+        )
+        .order_by(TimeSlot.dates, TimeSlot.trainer_id, TimeSlot.times)
+    )
+
+
+def bookable_range(
+    service_id: int | None,
+    group_class_id: int | None,
+    trainer_ids: list[int] | None,
+    date_from: date,
+    date_to: date,
+    today: date,
+):
+    return range_query(bool(group_class_id), bool(trainer_ids)).params(
+        service_id=service_id,
+        group_class_id=group_class_id,
+        trainer_ids=trainer_ids,
+        date_from=date_from,
+        date_to=date_to,
+        today=today,
+    )
+
+
+def to_columns(rows, with_spots: bool) -> dict:
+    """Слоты в колоночном виде: дата -> тренер -> параллельные массивы"""
+    days: dict[str, dict[str, dict[str, list]]] = {}
+    for slot_date, trainer_id, slot_id, slot_time, spots in rows:
+        trainers = days.setdefault(slot_date.isoformat(), {})
+        columns = trainers.get(str(trainer_id))
+        if columns is None:
+            columns = {"ids": [], "times": []}
+            if with_spots:
+                columns["spots"] = []
+            trainers[str(trainer_id)] = columns
+        columns["ids"].append(slot_id)
+        columns["times"].append(slot_time.isoformat())
+        if with_spots:
+            columns["spots"].append(spots)
+    return days
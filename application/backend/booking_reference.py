@@ -0,0 +1,50 @@
+"""Подписанные ссылки на бронирования.
+
+Ссылку клиент получает в ответе на создание бронирования и по ней
+запрашивает детали. Ссылка — base64url от id бронирования и
+HMAC-SHA256 этого id, поэтому ссылку на чужое бронирование нельзя
+получить перебором id. Ключ подписи — ``BOOKING_REFERENCE_SECRET``, без
+него ключ выводится из ``POSTGRES_PASSWORD``, общего для всех воркеров.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+
+from utils.config import settings
+
+ID_BYTES = 8
+MAC_BYTES = 16
+
+SECRET = (
+    settings.BOOKING_REFERENCE_SECRET.encode()
+    or hashlib.sha256(
+        b"booking-reference:" + settings.POSTGRES_PASSWORD.encode()
+    ).digest()
+)
+
+
+def get_mac(payload: bytes) -> bytes:
+    return hmac.new(SECRET, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def sign_booking(booking_id: int) -> str:
+    payload = booking_id.to_bytes(ID_BYTES, "big")
+    token = base64.urlsafe_b64encode(payload + get_mac(payload))
+    return token.rstrip(b"=").decode()
+
+
+def parse_booking_reference(reference: str) -> int | None:
+    """id бронирования или None, если ссылка неверна или подделана"""
+    padding = "=" * (-len(reference) % 4)
+    try:
+        token = base64.urlsafe_b64decode(reference + padding)
+    except (binascii.Error, ValueError):
+        return None
+    payload, mac = token[:ID_BYTES], token[ID_BYTES:]
+    if len(token) != ID_BYTES + MAC_BYTES or not hmac.compare_digest(
+        mac, get_mac(payload)
+    ):
+        return None
+    return int.from_bytes(payload, "big")
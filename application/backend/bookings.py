@@ -0,0 +1,201 @@
+"""Атомарное бронирование временного слота одним запросом к БД.
+
+Слот резервируется условным ``UPDATE ... RETURNING``, а бронирование
+вставляется из его результата в том же выражении (``WITH reserved AS
+(UPDATE ...) INSERT ... SELECT``). Конкурирующие запросы к одному слоту
+упираются в блокировку строки, и после ее снятия PostgreSQL заново
+проверяет условие ``WHERE``, поэтому последнее место не может быть
+продано дважды, а запрос выполняется за один round-trip.
+
+Выражения собираются один раз по Core-таблицам (ORM-вставка с набором
+параметров выполнялась бы как bulk insert), а функции бронирования
+возвращают их вместе с параметрами для ``session.exec(statement,
+params=...)``. Имена параметров не совпадают с именами колонок, иначе
+SQLAlchemy добавил бы их в SET/VALUES.
+
+Детали бронирования для страницы успешной записи читаются по первичному
+ключу (``booking_details``) одним запросом с join-ами по первичным ключам.
+
+Тем же выражением отправляется ``pg_notify`` об изменении слота для
+инвалидации кэша свободных слотов во всех процессах (см.
+``utils.availability_cache``). Уведомление уходит только вместе с
+фиксацией транзакции и только если слот действительно зарезервирован.
+Выражение возвращает id бронирования и положение зарезервированного
+слота, по которому свой процесс сбрасывает кэш сразу после фиксации.
+"""
+
+from datetime import date, datetime
+from itertools import chain
+
+from sqlalchemy import (
+    Text,
+    bindparam,
+    cast,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+)
+
+from application.backend.availability import (
+    SLOT_DATE,
+    bookable_group_slot,
+    bookable_slot,
+)
+from utils.availability_cache import AVAILABILITY_CHANNEL
+from utils.models import Booking, GroupClass, Service, TimeSlot, Trainer
+
+booking_table = Booking.__table__
+timeslot_table = TimeSlot.__table__
+
+INDIVIDUAL_BOOKING_FIELDS = ("service_id", "trainer_id", "dates")
+GROUP_BOOKING_FIELDS = (
+    "class_id",
+    "dates",
+    "user_name",
+    "user_phone",
+    "user_email",
+)
+
+# Поля уведомления об изменении слота (SlotChange) и их колонки
+CHANGE_FIELDS = {
+    "service_id": "service_id",
+    "group_class_id": "group_class_id",
+    "trainer_id": "trainer_id",
+    "date": "dates",
+}
+
+
+def book_slot_statement(reserve, fields: tuple[str, ...]):
+    """Вставка бронирования для слота, зарезервированного ``reserve``"""
+    reserved = reserve.returning(
+        timeslot_table.c.id,
+        *(timeslot_table.c[column] for column in CHANGE_FIELDS.values()),
+    ).cte("reserved")
+    # CTE без ссылок на него не выполняется, поэтому он join-ится ниже
+    change = func.json_build_object(
+        *chain.from_iterable(
+            (key, reserved.c[column]) for key, column in CHANGE_FIELDS.items()
+        )
+    )
+    notified = select(
+        func.pg_notify(literal(AVAILABILITY_CHANNEL), cast(change, Text))
+    ).cte("notified")
+    columns = (*fields, "created_at")
+    inserted = (
+        insert(booking_table)
+        .from_select(
+            ["timeslot_id", *columns],
+            select(
+                reserved.c.id,
+                *(
+                    bindparam(
+                        f"booking_{name}", type_=booking_table.c[name].type
+                    )
+                    for name in columns
+                ),
+            ).select_from(reserved.join(notified, true())),
+        )
+        .returning(booking_table.c.id)
+        .cte("inserted")
+    )
+    # id бронирования и положение слота из БД, а не из тела запроса
+    return select(
+        inserted.c.id,
+        *(reserved.c[column] for column in CHANGE_FIELDS.values()),
+    ).select_from(inserted.join(reserved, true()))
+
+
+BOOK_INDIVIDUAL_SLOT = book_slot_statement(
+    update(timeslot_table)
+    .where(
+        TimeSlot.id == bindparam("slot_id"),
+        TimeSlot.dates == SLOT_DATE,
+        TimeSlot.service_id == bindparam("slot_service_id"),
+        *bookable_slot(),
+    )
+    .values(available=False),
+    INDIVIDUAL_BOOKING_FIELDS,
+)
+
+BOOK_GROUP_SLOT = book_slot_statement(
+    update(timeslot_table)
+    .where(
+        TimeSlot.id == bindparam("slot_id"),
+        TimeSlot.dates == SLOT_DATE,
+        TimeSlot.group_class_id == bindparam("slot_class_id"),
+        *bookable_group_slot(),
+    )
+    .values(
+        available_spots=timeslot_table.c.available_spots - 1,
+        available=timeslot_table.c.available_spots > 1,
+    ),
+    GROUP_BOOKING_FIELDS,
+)
+
+
+# Слот и справочники бронирования могут быть удалены (ON DELETE SET NULL),
+# у группового бронирования тренер берется из слота
+BOOKING_DETAILS_QUERY = (
+    select(
+        booking_table.c.dates,
+        TimeSlot.times,
+        func.coalesce(Service.name, GroupClass.name).label("service_name"),
+        Trainer.name.label("trainer_name"),
+    )
+    .select_from(booking_table)
+    .outerjoin(TimeSlot, booking_table.c.timeslot_id == TimeSlot.id)
+    .outerjoin(Service, booking_table.c.service_id == Service.id)
+    .outerjoin(GroupClass, booking_table.c.class_id == GroupClass.id)
+    .outerjoin(
+        Trainer,
+        Trainer.id
+        == func.coalesce(booking_table.c.trainer_id, TimeSlot.trainer_id),
+    )
+    .where(booking_table.c.id == bindparam("booking_id"))
+)
+
+
+def booking_params(booking_values: dict) -> dict:
+    values = {**booking_values, "created_at": datetime.utcnow()}
+    return {f"booking_{name}": value for name, value in values.items()}
+
+
+def book_individual_slot(
+    timeslot_id: int,
+    slot_date: date,
+    service_id: int,
+    booking_values: dict,
+    today: date,
+):
+    """Бронирование индивидуального занятия: слот становится занятым"""
+    return BOOK_INDIVIDUAL_SLOT, dict(
+        slot_id=timeslot_id,
+        slot_date=slot_date,
+        slot_service_id=service_id,
+        today=today,
+        **booking_params(booking_values),
+    )
+
+
+def book_group_slot(
+    timeslot_id: int,
+    slot_date: date,
+    class_id: int,
+    booking_values: dict,
+    today: date,
+):
+    """Бронирование места в группе: слот закрывается с последним местом"""
+    return BOOK_GROUP_SLOT, dict(
+        slot_id=timeslot_id,
+        slot_date=slot_date,
+        slot_class_id=class_id,
+        today=today,
+        **booking_params(booking_values),
+    )
+
+
+def booking_details(booking_id: int):
+    return BOOKING_DETAILS_QUERY.params(booking_id=booking_id)
@@ -750,7 +750,16 @@ start_date = datetime(2025, 1, 23)
 end_date = datetime(2025, 2, 23)
 
 
-def insert_data():
+def insert_data(
+    start: datetime = start_date,
+    end: datetime = end_date,
+    slot_times: list[time] = time_slots,
+):
+    """Заполнение БД справочниками и слотами на каждый день периода.
+
+    Объем данных задается периодом ``start``-``end`` и списком времен
+    ``slot_times``: по слоту на каждое время, день и пару тренер-занятие.
+    """
     with next(db.get_session()) as session:
         for trainer in trainers_data:
             trainer_entry = Trainer(**trainer)
@@ -778,17 +787,18 @@ def insert_data():
 
         services = session.exec(select(Service)).all()
         groups = session.exec(select(GroupClass)).all()
-        trainer_service_pairs = session.exec(select(TrainerService)).all()
-        trainer_group_pairs = session.exec(select(TrainerGroup)).all()
+        trainer_ids = session.exec(
+            select(Trainer.id).order_by(Trainer.id)
+        ).all()
 
         for service in services:
             if service.type.lower() == "massage":
                 trainer_service_entry = TrainerService(
-                    trainer_id=1, service_id=service.id
+                    trainer_id=trainer_ids[0], service_id=service.id
                 )
                 session.add(trainer_service_entry)
             else:
-                random_trainer = random.randint(2, 8)
+                random_trainer = random.choice(trainer_ids[1:])
                 trainer_service_entry = TrainerService(
                     trainer_id=random_trainer, service_id=service.id
                 )
@@ -797,7 +807,7 @@ def insert_data():
         session.commit()
 
         for group in groups:
-            random_trainer = random.randint(2, 8)
+            random_trainer = random.choice(trainer_ids[1:])
             trainer_group_entry = TrainerGroup(
                 trainer_id=random_trainer, group_class_id=group.id
             )
@@ -805,13 +815,17 @@ def insert_data():
 
         session.commit()
 
+        # Пары выбираются после вставки, иначе слоты не создаются
+        trainer_service_pairs = session.exec(select(TrainerService)).all()
+        trainer_group_pairs = session.exec(select(TrainerGroup)).all()
+
         for pair in trainer_service_pairs:
             trainer_id = pair.trainer_id
             service_id = pair.service_id
 
-            current_date = start_date
-            while current_date <= end_date:
-                for slot_time in time_slots:
+            current_date = start
+            while current_date <= end:
+                for slot_time in slot_times:
                     full_datetime = datetime.combine(
                         current_date.date(), slot_time
                     )
@@ -834,9 +848,9 @@ def insert_data():
             trainer_id = pair.trainer_id
             group_id = pair.group_class_id
 
-            current_date = start_date
-            while current_date <= end_date:
-                for slot_time in time_slots:
+            current_date = start
+            while current_date <= end:
+                for slot_time in slot_times:
                     full_datetime = datetime.combine(
                         current_date.date(), slot_time
                     )
@@ -1,47 +1,106 @@
-from contextlib import asynccontextmanager
-import os
+import asyncio
 
-import uvicorn
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 
+from application.backend.routes import router as rest_router
+from utils.availability_cache import (
+    AVAILABILITY_CHANNEL,
+    apply_slot_change,
+    availability_cache,
+)
+from utils.catalog_cache import (
+    CATALOG_CHANNEL,
+    apply_catalog_change,
+    catalog_cache,
+)
+from utils.compression import CompressionMiddleware
+from utils.config import settings
 from utils.database import db
-from utils.metrics import start_metrics_server_in_thread, track_request, time_request
+from utils.lifecycle import is_managed_worker
+from utils.metrics import (
+    PrometheusMiddleware,
+    cleanup_dead_workers,
+    metrics_endpoint,
+    metrics_registry,
+)
+from utils.notifications import start_listener
+from utils.responses import ORJSONResponse
+
+
+def init_service():
+    """Разовая инициализация сервиса до запуска воркеров"""
+    db.prepare_schema(
+        settings.DB_SCHEMA_MODE, settings.ALEMBIC_SCRIPT_LOCATION
+    )
 
-from application.backend.routes import router as rest_router
 
+def on_catalog_change(payload: str):
+    apply_catalog_change(payload)
+    # Имена и описания тренеров и занятий входят в ответы о слотах
+    if payload in ("trainers", "groups"):
+        availability_cache.clear()
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        path = request.url.path
-        
-        with time_request(method, path):
-            response = await call_next(request)
-            
-        status_code = response.status_code
-        track_request(method, path, status_code)
-        
-        return response
+
+def reset_caches():
+    availability_cache.clear()
+    catalog_cache.clear()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Установка имени сервиса для метрик
-    os.environ['SERVICE_NAME'] = 'application-backend'
+    metrics_registry.set_service_name('application-backend')
     
-    # Запуск сервера метрик на порту 8002
-    metrics_thread = start_metrics_server_in_thread(port=8002)
+    # Удаление файлов метрик воркеров, завершившихся до старта
+    cleanup_dead_workers()
     
-    db.create_db_and_tables()
+    # Под лаунчером схему один раз готовит мастер-процесс
+    if not is_managed_worker():
+        init_service()
+
+    # Инвалидация кэшей по уведомлениям из других процессов. Подписка
+    # раньше построения снимка: изменения во время построения не теряются
+    listener = None
+    if availability_cache.enabled or catalog_cache.enabled:
+        listener = await start_listener(
+            settings.DATABASE_URL,
+            {
+                AVAILABILITY_CHANNEL: apply_slot_change,
+                CATALOG_CHANNEL: on_catalog_change,
+            },
+            on_reset=reset_caches,
+        )
+
+    # Снимок справочников строится до приема запросов
+    if catalog_cache.enabled:
+        await catalog_cache.refresh()
     yield
+    if listener is not None:
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+    await catalog_cache.close()
+    await db.dispose()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(rest_router)
 
+# Метрики отдаются самим приложением на /metrics
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Сжатие ответов, время сжатия входит в метрики запроса
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    cache_size=settings.COMPRESSION_CACHE_SIZE,
+)
+
 # Добавление middleware для сбора метрик
 app.add_middleware(PrometheusMiddleware)
 
@@ -52,6 +111,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
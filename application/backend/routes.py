@@ -1,27 +1,56 @@
-from datetime import datetime
-from typing import Annotated
-
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-
-from utils.database import db
-from utils.models import (
-    Booking,
-    Branch,
-    GroupClass,
-    Service,
-    TimeSlot,
-    Trainer,
+from datetime import date as date_type, datetime
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from application.backend.availability import (
+    MAX_RANGE_DAYS,
+    bookable_group_classes,
+    bookable_range,
+    bookable_timeslots,
+    bookable_trainers,
+    to_columns,
+    to_group_class_rows,
+    to_normalized_group_classes,
+)
+from application.backend.booking_reference import (
+    parse_booking_reference,
+    sign_booking,
+)
+from application.backend.bookings import (
+    book_group_slot,
+    book_individual_slot,
+    booking_details,
+)
+from utils.availability_cache import (
+    SlotChange,
+    availability_cache,
+    booking_details_entry,
+    group_classes_entry,
+    timeslots_entry,
+    trainers_entry,
 )
+from utils.catalog_cache import catalog_response
+from utils.config import settings
+from utils.database import db
+from utils.responses import dumps, json_response, rows_to_json
 
-SessionDep = Annotated[Session, Depends(db.get_session)]
+SessionDep = Annotated[AsyncSession, Depends(db.get_async_session)]
 router = APIRouter()
 
 
+def parse_date(value: str) -> date_type:
+    """Разбор даты из параметров запроса для типизированных запросов к БД"""
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректная дата")
+
+
 @router.get("/api/services")
-async def return_services_endpoint(session: SessionDep):
-    services = session.exec(select(Service)).all()
-    return services
+async def return_services_endpoint(request: Request):
+    return await catalog_response(request, "services")
 
 
 @router.get("/api/trainers")
@@ -31,23 +60,13 @@ async def return_trainers_endpoint(
     service_id: int = Query(None, alias="serviceId"),
 ):
     today = datetime.now().date()
-    query = (
-        select(Trainer)
-        .join(Trainer.time_slots)
-        .where(
-            (TimeSlot.service_id == service_id if service_id else True),
-            (
-                TimeSlot.group_class_id == group_class_id
-                if group_class_id
-                else True
-            ),
-            TimeSlot.dates >= today,
-            TimeSlot.available is True,
-        )
-        .distinct()
-    )
-    trainers = session.exec(query).all()
-    return trainers
+
+    async def load():
+        query = bookable_trainers(service_id, group_class_id, today)
+        return rows_to_json((await session.exec(query)).all())
+
+    key, tags = trainers_entry(service_id, group_class_id, today)
+    return json_response(await availability_cache.get_or_load(key, tags, load))
 
 
 @router.get("/api/timeslots")
@@ -57,160 +76,159 @@ async def return_timeslots_endpoint(
     trainer_id: int = Query(..., alias="trainerId"),
     date: str = Query(..., format="date"),
 ):
-    timeslots = session.exec(
-        select(TimeSlot).where(
-            TimeSlot.trainer_id == trainer_id,
-            TimeSlot.dates == date,
-            TimeSlot.service_id == service_id,
-            TimeSlot.available is True,
+    today = datetime.now().date()
+    slot_date = parse_date(date)
+
+    async def load():
+        query = bookable_timeslots(trainer_id, service_id, slot_date, today)
+        return rows_to_json((await session.exec(query)).all())
+
+    key, tags = timeslots_entry(service_id, trainer_id, slot_date, today)
+    return json_response(await availability_cache.get_or_load(key, tags, load))
+
+
+@router.get("/api/timeslots/range")
+async def return_timeslots_range_endpoint(
+    session: SessionDep,
+    date_from: str = Query(..., alias="dateFrom", format="date"),
+    date_to: str = Query(..., alias="dateTo", format="date"),
+    service_id: int = Query(None, alias="serviceId"),
+    group_class_id: int = Query(None, alias="classId"),
+    trainer_ids: list[int] = Query(None, alias="trainerId"),
+):
+    """Свободные слоты за период одним запросом.
+
+    Ответ сгруппирован по дате и тренеру, слоты тренера передаются
+    параллельными массивами ``ids``/``times`` (и ``spots`` для групп).
+    """
+    if bool(service_id) == bool(group_class_id):
+        raise HTTPException(
+            status_code=400, detail="Укажите serviceId или classId"
         )
-    ).all()
-    return timeslots
+    start, end = parse_date(date_from), parse_date(date_to)
+    if not 0 <= (end - start).days < MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail="Некорректный период")
+
+    today = datetime.now().date()
+    query = bookable_range(
+        service_id, group_class_id, trainer_ids, start, end, today
+    )
+    rows = (await session.exec(query)).all()
+    return json_response(
+        dumps(
+            {
+                "dateFrom": start,
+                "dateTo": end,
+                "days": to_columns(rows, with_spots=bool(group_class_id)),
+            }
+        )
+    )
 
 
 @router.post("/api/bookings")
 async def post_booking_data_endpoint(session: SessionDep, booking_data: dict):
+    slot_date = parse_date(booking_data["date"])
+    today = datetime.now().date()
     if "serviceId" in booking_data:
-        timeslot = session.exec(
-            select(TimeSlot).where(
-                TimeSlot.id == booking_data["timeSlotId"],
-                TimeSlot.dates == booking_data["date"],
-                TimeSlot.service_id == booking_data["serviceId"],
-                TimeSlot.available is True,
-            )
-        ).first()
-
-        if not timeslot:
-            raise HTTPException(
-                status_code=400, detail="Выбранное время уже занято"
-            )
-
-        timeslot.available = False
-
-        new_booking = Booking(
-            service_id=booking_data["serviceId"],
-            trainer_id=booking_data["trainerId"],
-            dates=booking_data["date"],
-            timeslot_id=booking_data["timeSlotId"],
+        statement, params = book_individual_slot(
+            booking_data["timeSlotId"],
+            slot_date,
+            booking_data["serviceId"],
+            {
+                "service_id": booking_data["serviceId"],
+                "trainer_id": booking_data["trainerId"],
+                "dates": slot_date,
+            },
+            today,
         )
-
     else:
-        timeslot = session.exec(
-            select(TimeSlot).where(
-                TimeSlot.id == booking_data["timeSlotId"],
-                TimeSlot.dates == booking_data["date"],
-                TimeSlot.group_class_id == booking_data["classId"],
-                TimeSlot.available is True,
-                TimeSlot.available_spots > 0,
-            )
-        ).first()
-
-        if not timeslot:
-            raise HTTPException(
-                status_code=400, detail="Выбранное время уже занято"
-            )
-
-        timeslot.available_spots -= 1
-        if timeslot.available_spots == 0:
-            timeslot.available = False
-
-        new_booking = Booking(
-            class_id=booking_data["classId"],
-            dates=booking_data["date"],
-            timeslot_id=booking_data["timeSlotId"],
-            user_name=booking_data["name"],
-            user_phone=booking_data["phone"],
-            user_email=booking_data["email"],
+        statement, params = book_group_slot(
+            booking_data["timeSlotId"],
+            slot_date,
+            booking_data["classId"],
+            {
+                "class_id": booking_data["classId"],
+                "dates": slot_date,
+                "user_name": booking_data["name"],
+                "user_phone": booking_data["phone"],
+                "user_email": booking_data["email"],
+            },
+            today,
         )
 
-    session.add(new_booking)
-    session.commit()
+    booking = (await session.exec(statement, params=params)).first()
+    if booking is None:
+        await session.rollback()
+        raise HTTPException(
+            status_code=400, detail="Выбранное время уже занято"
+        )
+    await session.commit()
+    # Другие процессы получат уведомление, отправленное бронированием
+    availability_cache.invalidate([SlotChange.of(booking)])
 
     return {
         "message": "Бронирование успешно создано",
-        "booking_id": new_booking.id,
+        "booking_id": booking.id,
+        "reference": sign_booking(booking.id),
     }
 
 
 @router.get("/api/branch-info")
-async def get_about_info(session: SessionDep):
-    branch = session.exec(select(Branch)).all()
-    return branch
+async def get_about_info(request: Request):
+    return await catalog_response(request, "branch")
 
 
 @router.get("/api/booking-details")
-async def get_success_data(session: SessionDep):
-    query = (
-        select(
-            Booking.id,
-            Booking.dates,
-            TimeSlot.times.label("timeslot"),
-            Trainer.name.label("trainer_name"),
-            Service.name.label("service_name"),
+async def get_success_data(session: SessionDep, reference: str):
+    """Детали бронирования по ссылке из ответа на его создание"""
+    booking_id = parse_booking_reference(reference)
+    if booking_id is None:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+
+    async def load():
+        result = (await session.exec(booking_details(booking_id))).first()
+        if result is None:
+            return None
+        return dumps(
+            {
+                "serviceName": result.service_name,
+                "trainerName": result.trainer_name,
+                "date": result.dates,
+                "time": result.times,
+            }
         )
-        .join(TimeSlot, Booking.timeslot_id == TimeSlot.id)
-        .join(Trainer, Booking.trainer_id == Trainer.id)
-        .join(Service, Booking.service_id == Service.id)
-        .order_by(Booking.created_at.desc())
-        .limit(1)
-    )
-    result = session.exec(query).first()
 
-    if result:
-        return {
-            "serviceName": result.service_name,
-            "trainerName": result.trainer_name,
-            "date": result.dates,
-            "time": result.timeslot,
-        }
-    return {"error": "No booking found"}
+    key, tags = booking_details_entry(booking_id)
+    body = await availability_cache.get_or_load(
+        key, tags, load, settings.BOOKING_DETAILS_CACHE_TTL
+    )
+    if body is None:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    return json_response(body)
 
 
 @router.get("/api/group-classes")
 async def get_group_classes_endpoint(
-    session: SessionDep, date: str = Query(..., format="formattedDate")
+    session: SessionDep,
+    date: str = Query(..., format="formattedDate"),
+    shape: Literal["rows", "normalized"] = "rows",
 ):
-    query = (
-        select(GroupClass, Trainer, TimeSlot)
-        .join(TimeSlot, TimeSlot.group_class_id == GroupClass.id)
-        .join(Trainer, Trainer.id == TimeSlot.trainer_id)
-        .where(
-            TimeSlot.dates == date,
-            TimeSlot.available is True,
-            TimeSlot.available_spots > 0,
-        )
-        .order_by(TimeSlot.dates, TimeSlot.times)
-    )
+    """Групповые занятия на дату.
 
-    result = session.exec(query).all()
+    ``shape=normalized`` возвращает занятия и тренеров словарями по id и
+    ссылающиеся на них слоты вместо строки на каждый слот.
+    """
+    today = datetime.now().date()
+    slot_date = parse_date(date)
+    build = (
+        to_normalized_group_classes
+        if shape == "normalized"
+        else to_group_class_rows
+    )
 
-    response = []
-    for group_class, trainer, time_slot in result:
-        response.append(
-            {
-                "GroupClass": {
-                    "id": group_class.id,
-                    "name": group_class.name,
-                    "duration": group_class.duration,
-                    "description": group_class.description,
-                    "price": group_class.price,
-                },
-                "Trainer": {
-                    "id": trainer.id,
-                    "name": trainer.name,
-                    "description": trainer.description,
-                    "photo": trainer.photo,
-                },
-                "TimeSlot": {
-                    "id": time_slot.id,
-                    "trainer_id": time_slot.trainer_id,
-                    "date": time_slot.dates,
-                    "times": time_slot.times,
-                    "available": time_slot.available,
-                    "available_spots": time_slot.available_spots,
-                    "created_at": time_slot.created_at,
-                },
-            }
-        )
+    async def load():
+        query = bookable_group_classes(slot_date, today)
+        return dumps(build((await session.exec(query)).all()))
 
-    return response
+    key, tags = group_classes_entry(slot_date, today, shape)
+    return json_response(await availability_cache.get_or_load(key, tags, load))
@@ -29,12 +29,9 @@ interface Trainer {
 
 interface TimeSlot {
   id: number
-  trainer_id: number
   date: string
   times: string
-  available: boolean
-  available_spots: number
-  created_at: string
+  availableSpots: number
 }
 
 interface ClassData {
@@ -43,6 +40,17 @@ interface ClassData {
   TimeSlot: TimeSlot
 }
 
+interface GroupSlot extends TimeSlot {
+  classId: number
+  trainerId: number
+}
+
+interface GroupClassesResponse {
+  classes: Record<string, GroupClass>
+  trainers: Record<string, Trainer>
+  slots: GroupSlot[]
+}
+
 interface BookingFormData {
   name: string
   phone: string
@@ -78,10 +86,14 @@ export default function Group() {
     try {
       setLoading(true)
       const formattedDate = format(date, 'yyyy-MM-dd')
-      const response = await fetch(`http://localhost:8002/api/group-classes?date=${formattedDate}`)
+      const response = await fetch(`http://localhost:8002/api/group-classes?date=${formattedDate}&shape=normalized`)
       if (!response.ok) throw new Error('Failed to fetch classes')
-      const data: ClassData[] = await response.json()
-      setClasses(data)
+      const data: GroupClassesResponse = await response.json()
+      setClasses(data.slots.map(({ classId, trainerId, ...slot }) => ({
+        GroupClass: data.classes[classId],
+        Trainer: data.trainers[trainerId],
+        TimeSlot: slot
+      })))
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch classes')
     } finally {
@@ -204,7 +216,7 @@ export default function Group() {
             <div className="text-right">
               <div className="text-sm font-medium">{groupClass.price} ₽</div>
               <div className="text-sm text-muted-foreground mt-1">
-                Осталось {timeSlot.available_spots} мест
+                Осталось {timeSlot.availableSpots} мест
               </div>
             </div>
           </div>
@@ -239,7 +251,7 @@ export default function Group() {
                     <span>{formattedTime(timeSlot.times)} • {groupClass.duration} мин</span>
                   </div>
                   <div className="text-sm text-muted-foreground">
-                    Осталось {timeSlot.available_spots} мест
+                    Осталось {timeSlot.availableSpots} мест
                   </div>
                 </div>
                 <p className="text-sm text-muted-foreground">{groupClass.description}</p>
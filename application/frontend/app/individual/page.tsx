@@ -172,7 +172,8 @@ export default function IndividualBookingPage() {
         }),
       })
       if (!response.ok) throw new Error('Booking failed')
-      router.push('/success')
+      const { reference } = await response.json()
+      router.push(`/success?reference=${encodeURIComponent(reference)}`)
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred while confirming the booking')
     } finally {
@@ -22,7 +22,8 @@ export default function Success() {
   useEffect(() => {
     const fetchBookingDetails = async () => {
       try {
-        const response = await fetch('http://localhost:8002/api/booking-details', {
+        const reference = new URLSearchParams(window.location.search).get('reference') ?? ''
+        const response = await fetch(`http://localhost:8002/api/booking-details?reference=${encodeURIComponent(reference)}`, {
           headers: {
             'Authorization': `Bearer ${localStorage.getItem('access_token')}`
           }
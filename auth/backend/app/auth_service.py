@@ -5,19 +5,24 @@ from datetime import datetime
 from bot.main import otp_service
 from fastapi import HTTPException
 from models import AuthUser, TelegramOTP
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from utilits import password_manager, token_service
 
 logger = logging.getLogger(__name__)
 
 
 class AuthService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def authenticate_user(self, username: str, password: str) -> AuthUser:
-        user = self.session.exec(
-            select(AuthUser).where(AuthUser.username == username)
+    async def authenticate_user(
+        self, username: str, password: str
+    ) -> AuthUser:
+        user = (
+            await self.session.exec(
+                select(AuthUser).where(AuthUser.username == username)
+            )
         ).first()
         if not user or not password_manager.verify_password(
             password, user.password
@@ -27,15 +32,17 @@ class AuthService:
             )
 
         user.last_login = datetime.utcnow()
-        self.session.commit()
+        await self.session.commit()
         return user
 
-    def register_user(
+    async def register_user(
         self, username: str, email: str, password: str
     ) -> AuthUser:
         try:
-            existing_user = self.session.exec(
-                select(AuthUser).where(AuthUser.email == email)
+            existing_user = (
+                await self.session.exec(
+                    select(AuthUser).where(AuthUser.email == email)
+                )
             ).first()
             if existing_user:
                 raise HTTPException(
@@ -48,12 +55,12 @@ class AuthService:
                 password=password_manager.hash_password(password),
             )
             self.session.add(new_user)
-            self.session.commit()
-            self.session.refresh(new_user)
+            await self.session.commit()
+            await self.session.refresh(new_user)
 
             return new_user
         except Exception:
-            self.session.rollback()
+            await self.session.rollback()
             raise
 
     async def send_otp(self, telegram_id: int, username: str) -> TelegramOTP:
@@ -61,8 +68,12 @@ class AuthService:
         if not otp:
             raise HTTPException(status_code=500, detail="Failed to send OTP")
 
-        user_otp = self.session.exec(
-            select(TelegramOTP).where(TelegramOTP.telegram_id == telegram_id)
+        user_otp = (
+            await self.session.exec(
+                select(TelegramOTP).where(
+                    TelegramOTP.telegram_id == telegram_id
+                )
+            )
         ).first()
 
         if user_otp:
@@ -73,18 +84,22 @@ class AuthService:
             )
             self.session.add(user_otp)
 
-        self.session.commit()
+        await self.session.commit()
         return user_otp
 
-    def verify_otp(self, telegram_id: int, otp: str) -> str:
-        user_otp = self.session.exec(
-            select(TelegramOTP).where(TelegramOTP.telegram_id == telegram_id)
+    async def verify_otp(self, telegram_id: int, otp: str) -> str:
+        user_otp = (
+            await self.session.exec(
+                select(TelegramOTP).where(
+                    TelegramOTP.telegram_id == telegram_id
+                )
+            )
         ).first()
         if not user_otp or user_otp.otp != otp:
             raise HTTPException(status_code=400, detail="Invalid OTP")
 
         user_otp.otp = None
-        self.session.commit()
+        await self.session.commit()
         return token_service.create_access_token(
             data={"sub": user_otp.telegram_id}
         )
@@ -1,9 +1,17 @@
+import os
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     AUTH_BACKEND_DB_URL: str
-    ECHO_SQL: bool = True
+    ECHO_SQL: bool = False
+    DB_SCHEMA_MODE: str = "verify"
+    ALEMBIC_SCRIPT_LOCATION: str = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "alembic"
+    )
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_CACHE_SIZE: int = 512
 
     class Config:
         env_file = ".env"
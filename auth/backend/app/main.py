@@ -1,42 +1,45 @@
 import asyncio
-import os
 
 from contextlib import asynccontextmanager
 
 from bot.main import start_bot
+from config import settings
 from database import db
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from routes import router as auth_router
-from utils.metrics import start_metrics_server_in_thread, track_request, time_request
+from utils.compression import CompressionMiddleware
+from utils.lifecycle import is_managed_worker, run_singleton
+from utils.metrics import (
+    PrometheusMiddleware,
+    cleanup_dead_workers,
+    metrics_endpoint,
+    metrics_registry,
+)
+from utils.responses import ORJSONResponse
 
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        path = request.url.path
-        
-        with time_request(method, path):
-            response = await call_next(request)
-            
-        status_code = response.status_code
-        track_request(method, path, status_code)
-        
-        return response
+def init_service():
+    """Разовая инициализация сервиса до запуска воркеров"""
+    db.prepare_schema(
+        settings.DB_SCHEMA_MODE, settings.ALEMBIC_SCRIPT_LOCATION
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Установка имени сервиса для метрик
-    os.environ['SERVICE_NAME'] = 'auth-backend'
+    metrics_registry.set_service_name('auth-backend')
     
-    # Запуск сервера метрик на порту 8005
-    start_metrics_server_in_thread(port=8005)
+    # Удаление файлов метрик воркеров, завершившихся до старта
+    cleanup_dead_workers()
     
-    db.create_db_and_tables()
+    # Под лаунчером схему один раз готовит мастер-процесс
+    if not is_managed_worker():
+        init_service()
 
-    bot_task = asyncio.create_task(start_bot())
+    # Polling бота допускается только в одном процессе сервиса
+    bot_task = asyncio.create_task(run_singleton("auth-bot", start_bot))
     yield
     bot_task.cancel()
 
@@ -44,12 +47,23 @@ async def lifespan(app: FastAPI):
         await bot_task
     except asyncio.CancelledError:
         pass
+    await db.dispose()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(auth_router)
 
+# Метрики отдаются самим приложением на /metrics
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Сжатие ответов, время сжатия входит в метрики запроса
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    cache_size=settings.COMPRESSION_CACHE_SIZE,
+)
+
 # Добавление middleware для сбора метрик
 app.add_middleware(PrometheusMiddleware)
 
@@ -5,10 +5,11 @@ from database import db
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from models import AuthUser, TelegramOTP
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from utilits import token_service
 
-SessionDep = Annotated[Session, Depends(db.get_session)]
+SessionDep = Annotated[AsyncSession, Depends(db.get_async_session)]
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 router = APIRouter()
 
@@ -29,7 +30,7 @@ async def login(
 ):
     try:
         auth_service = AuthService(session)
-        user = auth_service.authenticate_user(
+        user = await auth_service.authenticate_user(
             form_data.username, form_data.password
         )
         access_token = token_service.create_access_token(
@@ -48,7 +49,7 @@ async def login(
 async def register_email(data: AuthUser, session: SessionDep):
     try:
         auth_service = AuthService(session)
-        user = auth_service.register_user(
+        user = await auth_service.register_user(
             data.username, data.email, data.password
         )
         access_token = token_service.create_access_token(
@@ -60,7 +61,7 @@ async def register_email(data: AuthUser, session: SessionDep):
             "username": user.username,
         }
     except HTTPException as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -71,7 +72,7 @@ async def register(data: TelegramOTP, session: SessionDep):
         otp = await auth_service.send_otp(data.telegram_id, data.username)
         return {"message": "OTP sent successfully", "otp": otp.otp}
     except HTTPException as e:
-        session.rollback()
+        await session.rollback()
         raise e
 
 
@@ -79,7 +80,9 @@ async def register(data: TelegramOTP, session: SessionDep):
 async def verify_otp(data: TelegramOTP, session: SessionDep):
     try:
         auth_service = AuthService(session)
-        access_token = auth_service.verify_otp(data.telegram_id, data.otp)
+        access_token = await auth_service.verify_otp(
+            data.telegram_id, data.otp
+        )
         return {
             "message": "OTP verified successfully",
             "access_token": access_token,
@@ -96,7 +99,7 @@ async def admin(data: TelegramOTP, session: SessionDep):
             TelegramOTP.telegram_id == data.telegram_id,
             TelegramOTP.is_admin,
         )
-        result = session.exec(query).one_or_none()
+        result = (await session.exec(query)).one_or_none()
         if not result:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -107,5 +110,5 @@ async def admin(data: TelegramOTP, session: SessionDep):
         otp = await auth_service.send_otp(data.telegram_id, data.username)
         return {"message": "OTP sent successfully", "otp": otp.otp}
     except HTTPException as e:
-        session.rollback()
+        await session.rollback()
         raise e
@@ -4,14 +4,21 @@ import sys
 # Добавляем корневой каталог проекта в путь поиска модулей Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+# Тестовая БД создается по моделям, а не миграциями alembic
+os.environ.setdefault("DB_SCHEMA_MODE", "create")
+# Тесты меняют данные в БД в обход API, кэши включаются в своих тестах
+os.environ.setdefault("AVAILABILITY_CACHE_SIZE", "0")
+os.environ.setdefault("CATALOG_CACHE_ENABLED", "False")
+
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 import pytest
 
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import Session, SQLModel, select
+from sqlmodel import Session, SQLModel, delete, select
 
 from admin.backend.main import app
 from utils.models import Branch, GroupClass, Service, TimeSlot, Trainer
@@ -124,6 +131,26 @@ def test_session():
     session.close()
 
 
+@pytest.fixture(scope="function")
+def new_trainer(test_session):
+    """Тренер с уникальным для запуска именем.
+
+    Слоты тренера и он сам удаляются после теста, поэтому повторный
+    запуск не упирается в уникальный индекс слотов.
+    """
+    trainer = Trainer(name=f"Тренер {uuid4().hex[:8]}", specialization="Йога")
+    test_session.add(trainer)
+    test_session.commit()
+    test_session.refresh(trainer)
+    yield trainer
+    test_session.rollback()
+    test_session.execute(
+        delete(TimeSlot).where(TimeSlot.trainer_id == trainer.id)
+    )
+    test_session.execute(delete(Trainer).where(Trainer.id == trainer.id))
+    test_session.commit()
+
+
 @pytest.fixture(scope="function")
 def test_client(test_session):
     def override_session():
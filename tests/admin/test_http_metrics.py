@@ -0,0 +1,113 @@
+from prometheus_client import REGISTRY
+
+
+def get_sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_by_route_template(test_client):
+    labels = {
+        "method": "GET",
+        "endpoint": "/api/admin/trainer/{trainer_id}",
+        "status": "404",
+        "service": "admin-backend",
+    }
+    before = get_sample("http_requests_total", labels)
+
+    for trainer_id in (999991, 999992, 999993):
+        response = test_client.get(f"/api/admin/trainer/{trainer_id}")
+        assert response.status_code == 404
+
+    assert get_sample("http_requests_total", labels) == before + 3
+    assert (
+        get_sample(
+            "http_requests_total",
+            {**labels, "endpoint": "/api/admin/trainer/999991"},
+        )
+        == 0
+    )
+
+
+def test_unmatched_paths_share_one_label(test_client):
+    labels = {
+        "method": "GET",
+        "endpoint": "<unmatched>",
+        "status": "404",
+        "service": "admin-backend",
+    }
+    before = get_sample("http_requests_total", labels)
+
+    test_client.get("/api/admin/unknown/1")
+    test_client.get("/api/admin/unknown/2")
+
+    assert get_sample("http_requests_total", labels) == before + 2
+
+
+def test_time_to_first_byte_and_in_progress(test_client):
+    labels = {
+        "method": "GET",
+        "endpoint": "/api/admin/trainers",
+        "service": "admin-backend",
+    }
+    before = get_sample("http_time_to_first_byte_seconds_count", labels)
+
+    response = test_client.get("/api/admin/trainers")
+
+    assert response.status_code == 200
+    assert (
+        get_sample("http_time_to_first_byte_seconds_count", labels)
+        == before + 1
+    )
+    assert (
+        get_sample(
+            "http_requests_in_progress", {"service": "admin-backend"}
+        )
+        == 0
+    )
+
+
+def test_metrics_registry_caches_children_and_bounds_size():
+    from utils.metrics import REQUEST_LATENCY, MetricsRegistry
+
+    registry = MetricsRegistry(max_children=2)
+    registry.set_service_name("admin-backend")
+    first = registry.http("GET", "/a")
+    assert registry.http("GET", "/a") is first
+    assert first.count(200) is first.count(200)
+
+    registry.http("GET", "/b")
+    registry.http("GET", "/c")
+    assert registry.http("GET", "/a") is not first
+    child = registry.labels(REQUEST_LATENCY, "GET", "/x")
+    assert registry.labels(REQUEST_LATENCY, "GET", "/x") is child
+
+
+def test_metrics_endpoint_served_by_app(test_client):
+    test_client.get("/api/admin/trainer/999991")
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'service="admin-backend"' in response.text
+
+
+def test_cleanup_dead_workers_removes_live_gauges(tmp_path, monkeypatch):
+    from utils import metrics
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        metrics, "is_process_alive", lambda pid: pid == 1
+    )
+    for name in (
+        "gauge_livesum_1.db",
+        "gauge_livesum_424242.db",
+        "counter_424242.db",
+    ):
+        (tmp_path / name).touch()
+
+    assert metrics.cleanup_dead_workers() == [424242]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "counter_424242.db",
+        "gauge_livesum_1.db",
+    ]
@@ -1,4 +1,7 @@
+import pytest
+
 from sqlmodel import select
+from utils.catalog_cache import catalog_cache
 from utils.models import Service
 
 
@@ -185,3 +188,40 @@ def test_edit_service_not_found(test_client):
     assert response.status_code == 404
     assert "detail" in response.json()
     assert "не найден" in response.json()["detail"]
+
+
+# Включается после старта клиента: без слушателя уведомлений, который
+# сбрасывает кэш при подписке
+@pytest.fixture
+def enabled_catalog_cache(monkeypatch):
+    monkeypatch.setattr(catalog_cache, "enabled", True)
+    catalog_cache.clear()
+    yield catalog_cache
+    catalog_cache.clear()
+
+
+def test_edit_service_changes_catalog_etag(
+    test_client, test_session, enabled_catalog_cache
+):
+    service = test_session.execute(select(Service).limit(1)).scalars().first()
+    response = test_client.get("/api/admin/services")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = test_client.put(
+        f"/api/admin/service/edit/{service.id}",
+        json={
+            "name": service.name,
+            "duration": service.duration,
+            "description": f"{service.description} (изменено)",
+            "price": service.price,
+            "type": service.type,
+        },
+    )
+    assert response.status_code == 200
+
+    response = test_client.get(
+        "/api/admin/services", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -3,7 +3,9 @@ from datetime import datetime, timedelta
 from fastapi import status
 import pytest
 
-from utils.models import Service, TimeSlot, Trainer
+from tests.admin.conftest import engine
+from utils.availability_cache import AVAILABILITY_CHANNEL, SlotChange
+from utils.models import Booking, GroupClass, Service, TimeSlot, Trainer
 
 
 def test_get_timeslot(test_client, test_session):
@@ -351,3 +353,303 @@ def test_edit_with_nonexistent_group_class(test_client, test_session):
 
     response_data = response.json()
     assert "detail" in response_data
+
+
+def test_delete_time_slot_notifies_availability_listeners(
+    test_client, test_session
+):
+    trainer = test_session.query(Trainer).first()
+    service = test_session.query(Service).first()
+    slot_date = (datetime.now() + timedelta(days=2)).date()
+    time_slot = TimeSlot(
+        trainer_id=trainer.id,
+        service_id=service.id,
+        dates=slot_date,
+        times=datetime.now().time(),
+        available=True,
+    )
+    test_session.add(time_slot)
+    test_session.commit()
+    test_session.refresh(time_slot)
+
+    listener = engine.raw_connection()
+    try:
+        listener.driver_connection.autocommit = True
+        listener.cursor().execute(f"LISTEN {AVAILABILITY_CHANNEL}")
+
+        response = test_client.delete(
+            f"/api/admin/time/delete/{time_slot.id}"
+        )
+        assert response.status_code == 200
+
+        listener.driver_connection.poll()
+        payloads = [
+            notify.payload for notify in listener.driver_connection.notifies
+        ]
+    finally:
+        listener.close()
+
+    assert SlotChange(
+        service.id, None, trainer.id, slot_date
+    ).to_payload() in payloads
+
+
+def test_delete_booked_time_slot_keeps_booking(test_client, test_session):
+    trainer = test_session.query(Trainer).first()
+    service = test_session.query(Service).first()
+    slot_date = (datetime.now() + timedelta(days=4)).date()
+    time_slot = TimeSlot(
+        trainer_id=trainer.id,
+        service_id=service.id,
+        dates=slot_date,
+        times=datetime.now().time(),
+        available=False,
+    )
+    test_session.add(time_slot)
+    test_session.commit()
+    booking = Booking(
+        trainer_id=trainer.id,
+        service_id=service.id,
+        timeslot_id=time_slot.id,
+        dates=slot_date,
+    )
+    test_session.add(booking)
+    test_session.commit()
+
+    response = test_client.delete(f"/api/admin/time/delete/{time_slot.id}")
+
+    assert response.status_code == 200
+    test_session.refresh(booking)
+    assert booking.timeslot_id is None
+    assert booking.dates == slot_date
+
+
+def test_bulk_add_time_slots_skips_existing(
+    test_client, test_session, new_trainer
+):
+    trainer = new_trainer
+    group = test_session.query(GroupClass).first()
+    # Две недели с понедельника: по два занятия в понедельник и среду
+    start = datetime(2031, 3, 3).date()
+    schedule = {
+        "trainer_id": trainer.id,
+        "group_class_id": group.id,
+        "date_from": start.isoformat(),
+        "date_to": (start + timedelta(days=13)).isoformat(),
+        "weekdays": [0, 2],
+        "times": ["09:00", "18:30"],
+        "available_spots": 12,
+    }
+
+    first = test_client.post("/api/admin/time/bulk", json=schedule)
+    again = test_client.post(
+        "/api/admin/time/bulk",
+        json={**schedule, "date_to": (start + timedelta(days=20)).isoformat()},
+    )
+
+    assert first.status_code == 200
+    assert (first.json()["created"], first.json()["skipped"]) == (8, 0)
+    assert (again.json()["created"], again.json()["skipped"]) == (4, 8)
+    slots = (
+        test_session.query(TimeSlot)
+        .filter(
+            TimeSlot.trainer_id == trainer.id,
+            TimeSlot.group_class_id == group.id,
+            TimeSlot.dates >= start,
+            TimeSlot.dates <= start + timedelta(days=20),
+        )
+        .all()
+    )
+    assert len(slots) == 12
+    assert {slot.dates.weekday() for slot in slots} == {0, 2}
+    assert {slot.available_spots for slot in slots} == {12}
+
+    duplicate = test_client.post(
+        "/api/admin/time/add",
+        json={
+            "trainer_name": trainer.name,
+            "group_name": group.name,
+            "date": start.isoformat(),
+            "time": "09:00",
+            "status": True,
+            "available_spots": 12,
+        },
+    )
+    assert duplicate.status_code == 400
+    assert duplicate.json() == {
+        "detail": "Такой временной слот уже существует"
+    }
+
+
+def test_bulk_add_time_slots_requires_single_target(test_client, test_session):
+    trainer = test_session.query(Trainer).first()
+    service = test_session.query(Service).first()
+    group = test_session.query(GroupClass).first()
+
+    response = test_client.post(
+        "/api/admin/time/bulk",
+        json={
+            "trainer_id": trainer.id,
+            "service_id": service.id,
+            "group_class_id": group.id,
+            "date_from": "2031-03-03",
+            "date_to": "2031-03-09",
+            "weekdays": [0],
+            "times": ["09:00"],
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": "Укажите услугу или групповое занятие"
+    }
+
+
+def test_edit_time_slot_by_ids(test_client, test_session, new_trainer):
+    trainer = new_trainer
+    group = test_session.query(GroupClass).first()
+    slot = TimeSlot(
+        trainer_id=trainer.id,
+        service_id=test_session.query(Service).first().id,
+        dates=datetime(2031, 4, 7).date(),
+        times=datetime(2031, 4, 7, 9).time(),
+        available=True,
+        available_spots=1,
+    )
+    test_session.add(slot)
+    test_session.commit()
+
+    response = test_client.put(
+        f"/api/admin/time/edit/{slot.id}",
+        json={
+            "trainer_id": trainer.id,
+            "group_id": group.id,
+            "date": "2031-04-08",
+            "time": "10:30",
+            "status": False,
+            "available_spots": 6,
+        },
+    )
+    unknown = test_client.put(
+        f"/api/admin/time/edit/{slot.id}",
+        json={
+            "trainer_id": 99999,
+            "date": "2031-04-08",
+            "time": "10:30",
+            "status": False,
+            "available_spots": 6,
+        },
+    )
+
+    assert response.status_code == 200
+    test_session.refresh(slot)
+    assert (slot.service_id, slot.group_class_id) == (None, group.id)
+    assert str(slot.dates) == "2031-04-08"
+    assert str(slot.times) == "10:30:00"
+    assert (slot.available, slot.available_spots) == (False, 6)
+    assert unknown.status_code == 400
+    assert unknown.json() == {"detail": "Тренер '99999' не найден"}
+
+
+def test_trainer_rename_resets_name_ids(
+    test_client, test_session, new_trainer, monkeypatch
+):
+    from admin.backend.catalog_ids import catalog_ids
+
+    monkeypatch.setattr(catalog_ids, "enabled", True)
+    monkeypatch.setattr(catalog_ids, "_catalogs", {})
+    trainer = new_trainer
+    old_name, new_name = trainer.name, f"{trainer.name} (новое имя)"
+    service = test_session.query(Service).first()
+    slot = {
+        "service_name": service.name,
+        "date": "2031-05-05",
+        "time": "09:00",
+        "status": True,
+        "available_spots": 1,
+    }
+
+    before = test_client.post(
+        "/api/admin/time/add",
+        json={**slot, "trainer_name": old_name},
+    )
+    test_client.put(
+        f"/api/admin/trainer/edit/{trainer.id}",
+        json={"name": new_name, "specialization": "Йога"},
+    )
+    by_old_name = test_client.post(
+        "/api/admin/time/add",
+        json={**slot, "trainer_name": old_name, "time": "10:00"},
+    )
+    by_new_name = test_client.post(
+        "/api/admin/time/add",
+        json={**slot, "trainer_name": new_name, "time": "10:00"},
+    )
+
+    assert before.status_code == 200
+    assert by_old_name.status_code == 400
+    assert by_new_name.status_code == 200
+    assert by_new_name.json()["time_slot"]["trainer_id"] == trainer.id
+
+
+def test_times_keyset_pages(test_client, test_session):
+    trainer = Trainer(name="Тренер страниц", specialization="Йога")
+    test_session.add(trainer)
+    test_session.commit()
+    service = test_session.query(Service).first()
+    for day, hour, service_id in [
+        (9, 10, service.id),
+        (8, 12, service.id),
+        (8, 9, service.id),
+        (9, 9, service.id),
+        (8, 12, None),
+    ]:
+        test_session.add(
+            TimeSlot(
+                trainer_id=trainer.id,
+                service_id=service_id,
+                dates=datetime(2031, 6, day).date(),
+                times=datetime(2031, 6, day, hour).time(),
+                available=True,
+            )
+        )
+    test_session.commit()
+
+    url = (
+        f"/api/admin/times?trainer_id={trainer.id}&date_from=2031-06-01"
+        "&limit=2&fields=date,time,available_spots"
+    )
+    pages, cursor = [], None
+    while True:
+        response = test_client.get(
+            url + (f"&after={cursor}" if cursor else "") + "&total=exact"
+        )
+        assert response.status_code == 200
+        assert response.headers["x-total-count"] == "5"
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [
+        (slot["date"], slot["time"]) for page in pages for slot in page
+    ] == [
+        ("2031-06-08", "09:00:00"),
+        ("2031-06-08", "12:00:00"),
+        ("2031-06-08", "12:00:00"),
+        ("2031-06-09", "09:00:00"),
+        ("2031-06-09", "10:00:00"),
+    ]
+    assert set(pages[0][0]) == {"date", "time", "available_spots"}
+    assert pages[0][0]["available_spots"] == 0
+
+
+def test_times_rejects_bad_cursor_and_fields(test_client):
+    cursor = test_client.get("/api/admin/times?after=bm90LWpzb24")
+    fields = test_client.get("/api/admin/times?fields=date,password")
+
+    assert cursor.status_code == 400
+    assert cursor.json() == {"detail": "Некорректный курсор"}
+    assert fields.status_code == 400
+    assert fields.json() == {"detail": "Неизвестное поле 'password'"}
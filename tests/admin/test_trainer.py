@@ -1,4 +1,6 @@
-from sqlmodel import select
+from uuid import uuid4
+
+from sqlmodel import delete, select
 from utils.models import Trainer
 
 
@@ -167,3 +169,51 @@ def test_edit_trainer_not_found(test_client):
     assert response.status_code == 404
     assert "detail" in response.json()
     assert "не найден" in response.json()["detail"]
+
+
+def test_trainers_page_with_search(test_client, test_session):
+    # Префикс уникален для запуска: поиск не видит тренеров прошлых запусков
+    prefix = f"Поиск {uuid4().hex[:8]}"
+    trainers = [
+        Trainer(name=f"{prefix} {name}", specialization="Йога")
+        for name in ["Анна", "Борис", "Вера"]
+    ]
+    test_session.add_all(trainers)
+    test_session.commit()
+
+    try:
+        first = test_client.get(
+            "/api/admin/trainers",
+            params={
+                "q": prefix,
+                "limit": 2,
+                "fields": "name",
+                "total": "estimate",
+            },
+        )
+        second = test_client.get(
+            "/api/admin/trainers",
+            params={
+                "q": prefix,
+                "limit": 2,
+                "fields": "name",
+                "after": first.headers["x-next-cursor"],
+            },
+        )
+    finally:
+        test_session.execute(
+            delete(Trainer).where(
+                Trainer.id.in_([trainer.id for trainer in trainers])
+            )
+        )
+        test_session.commit()
+
+    assert first.status_code == 200
+    assert "x-total-count" in first.headers
+    assert first.json() == [
+        {"name": f"{prefix} Анна"},
+        {"name": f"{prefix} Борис"},
+    ]
+    assert second.json() == [{"name": f"{prefix} Вера"}]
+    assert "x-next-cursor" not in second.headers
+    assert "etag" not in first.headers
@@ -0,0 +1,163 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from application.backend.availability import (
+    TIMESLOTS_QUERY,
+    bookable_timeslots,
+    trainers_query,
+)
+from utils.models import GroupClass, Service, TimeSlot, Trainer
+
+
+def test_bookable_predicates_reach_sql():
+    sql = str(TIMESLOTS_QUERY.compile(dialect=postgresql.dialect()))
+
+    assert "timeslot.available AND timeslot.dates >=" in sql
+    assert "false" not in sql.lower()
+
+
+def test_statements_are_built_once():
+    assert trainers_query(True, False) is trainers_query(True, False)
+    today = datetime.now().date()
+    query = bookable_timeslots(1, 2, today, today)
+    assert query._generate_cache_key() == (
+        TIMESLOTS_QUERY._generate_cache_key()
+    )
+
+
+def test_timeslots_return_only_bookable_slots(test_client, test_session):
+    trainer = test_session.execute(select(Trainer)).scalars().first()
+    service = test_session.execute(select(Service)).scalars().first()
+    slot_date = (datetime.now() + timedelta(days=5)).date()
+    open_slot, closed_slot = (
+        TimeSlot(
+            trainer_id=trainer.id,
+            service_id=service.id,
+            dates=slot_date,
+            times=datetime.now().time(),
+            available=available,
+        )
+        for available in (True, False)
+    )
+    test_session.add_all([open_slot, closed_slot])
+    test_session.commit()
+
+    response = test_client.get(
+        "/api/timeslots",
+        params={
+            "service_id": service.id,
+            "trainerId": trainer.id,
+            "date": slot_date.isoformat(),
+        },
+    )
+
+    assert response.status_code == 200
+    ids = {slot["id"] for slot in response.json()}
+    assert open_slot.id in ids
+    assert closed_slot.id not in ids
+
+
+def test_range_returns_columnar_slots(
+    test_client, test_session, new_trainer
+):
+    trainer = new_trainer
+    service = test_session.execute(select(Service)).scalars().first()
+    first_day = (datetime.now() + timedelta(days=10)).date()
+    slots = [
+        TimeSlot(
+            trainer_id=trainer.id,
+            service_id=service.id,
+            dates=first_day + timedelta(days=offset),
+            times=datetime(2000, 1, 1, hour).time(),
+            available=True,
+        )
+        for offset in (0, 2)
+        for hour in (10, 9)
+    ]
+    test_session.add_all(slots)
+    test_session.commit()
+
+    response = test_client.get(
+        "/api/timeslots/range",
+        params={
+            "serviceId": service.id,
+            "trainerId": [trainer.id],
+            "dateFrom": first_day.isoformat(),
+            "dateTo": (first_day + timedelta(days=6)).isoformat(),
+        },
+    )
+
+    assert response.status_code == 200
+    days = response.json()["days"]
+    day = days[first_day.isoformat()][str(trainer.id)]
+    assert day["times"] == ["09:00:00", "10:00:00"]
+    assert day["ids"] == [slots[1].id, slots[0].id]
+    assert "spots" not in day
+    assert (first_day + timedelta(days=1)).isoformat() not in days
+
+
+def test_range_requires_single_target_and_bounded_period(test_client):
+    today = datetime.now().date()
+    params = {"dateFrom": today.isoformat(), "dateTo": today.isoformat()}
+
+    response = test_client.get("/api/timeslots/range", params=params)
+    assert response.status_code == 400
+    too_long = {
+        **params,
+        "serviceId": 1,
+        "dateTo": (today + timedelta(days=100)).isoformat(),
+    }
+    response = test_client.get("/api/timeslots/range", params=too_long)
+    assert response.status_code == 400
+
+
+def test_group_classes_normalized_shape(
+    test_client, test_session, new_trainer
+):
+    trainer = new_trainer
+    group = test_session.execute(select(GroupClass)).scalars().first()
+    slot_date = (datetime.now() + timedelta(days=11)).date()
+    slots = [
+        TimeSlot(
+            trainer_id=trainer.id,
+            group_class_id=group.id,
+            dates=slot_date,
+            times=time(hour),
+            available=True,
+            available_spots=5,
+        )
+        for hour in (10, 12)
+    ]
+    test_session.add_all(slots)
+    test_session.commit()
+    params = {"date": slot_date.isoformat()}
+
+    rows = test_client.get("/api/group-classes", params=params).json()
+    normalized = test_client.get(
+        "/api/group-classes", params={**params, "shape": "normalized"}
+    ).json()
+
+    # В тот же день могут быть занятия других тренеров
+    rows = [row for row in rows if row["Trainer"]["id"] == trainer.id]
+    own_slots = [
+        slot for slot in normalized["slots"] if slot["trainerId"] == trainer.id
+    ]
+    assert len(rows) == len(own_slots) == 2
+    assert normalized["classes"][str(group.id)] == rows[0]["GroupClass"]
+    assert normalized["trainers"][str(trainer.id)] == rows[0]["Trainer"]
+    assert set(normalized["trainers"]) == {
+        str(slot["trainerId"]) for slot in normalized["slots"]
+    }
+    assert [slot["id"] for slot in own_slots] == [
+        row["TimeSlot"]["id"] for row in rows
+    ]
+    assert own_slots[0] == {
+        "id": slots[0].id,
+        "classId": group.id,
+        "trainerId": trainer.id,
+        "date": slot_date.isoformat(),
+        "times": "10:00:00",
+        "availableSpots": 5,
+    }
@@ -0,0 +1,214 @@
+import asyncio
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from tests.app.conftest import TEST_DATABASE_URL, engine
+from utils.availability_cache import (
+    AVAILABILITY_CHANNEL,
+    AvailabilityCache,
+    SlotChange,
+    availability_cache,
+    group_classes_entry,
+    timeslots_entry,
+    trainers_entry,
+)
+from utils.models import Service, TimeSlot, Trainer
+from utils.notifications import listen, start_listener
+
+DAY = date(2030, 5, 1)
+TODAY = date(2030, 4, 1)
+
+
+def test_change_invalidates_only_matching_entries():
+    cache = AvailabilityCache(max_entries=16, ttl=60)
+    entries = {
+        "slots": timeslots_entry(1, 7, DAY, TODAY),
+        "other-trainer": timeslots_entry(1, 8, DAY, TODAY),
+        "other-day": timeslots_entry(1, 7, DAY + timedelta(days=1), TODAY),
+        "service-trainers": trainers_entry(1, None, TODAY),
+        "other-service-trainers": trainers_entry(2, None, TODAY),
+        "groups": group_classes_entry(DAY, TODAY),
+    }
+    for name, (key, tags) in entries.items():
+        cache.put(key, name, tags, cache.version)
+
+    cache.invalidate([SlotChange(1, None, 7, DAY)])
+
+    cached = {
+        name for name, (key, _) in entries.items() if cache.get(key)
+    }
+    assert cached == {
+        "other-trainer",
+        "other-day",
+        "other-service-trainers",
+        "groups",
+    }
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AvailabilityCache(max_entries=2, ttl=60)
+    entries = [
+        timeslots_entry(1, trainer, DAY, TODAY) for trainer in (1, 2, 3)
+    ]
+    for (key, tags), value in zip(entries[:2], ("first", "second")):
+        cache.put(key, value, tags, cache.version)
+    assert cache.get(entries[0][0]) == "first"
+
+    key, tags = entries[2]
+    cache.put(key, "third", tags, cache.version)
+
+    assert len(cache) == 2
+    assert cache.get(entries[1][0]) is None
+    assert cache.get(entries[0][0]) == "first"
+
+
+def test_value_read_before_invalidation_is_not_stored():
+    cache = AvailabilityCache(max_entries=16, ttl=60)
+    key, tags = group_classes_entry(DAY, TODAY)
+    version = cache.version
+
+    cache.invalidate([SlotChange(None, 3, 5, DAY)])
+    cache.put(key, ["stale"], tags, version)
+
+    assert cache.get(key) is None
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    monkeypatch.setattr(availability_cache, "max_entries", 64)
+    yield availability_cache
+    availability_cache.clear()
+
+
+@pytest.mark.parametrize("sent_trainer", [0, 1])
+def test_booking_invalidates_cached_timeslots(
+    test_client, test_session, enabled_cache, sent_trainer
+):
+    # Кэш сбрасывается по тренеру слота, даже если клиент прислал другого
+    trainers = test_session.execute(select(Trainer)).scalars().all()
+    trainer = trainers[0]
+    service = test_session.execute(select(Service)).scalars().first()
+    slot_date = (datetime.now() + timedelta(days=9)).date()
+    slot = TimeSlot(
+        trainer_id=trainer.id,
+        service_id=service.id,
+        dates=slot_date,
+        times=datetime.now().time(),
+        available=True,
+    )
+    test_session.add(slot)
+    test_session.commit()
+    params = {
+        "service_id": service.id,
+        "trainerId": trainer.id,
+        "date": slot_date.isoformat(),
+    }
+
+    first = test_client.get("/api/timeslots", params=params).json()
+    assert test_client.get("/api/timeslots", params=params).json() == first
+    assert slot.id in {item["id"] for item in first}
+
+    response = test_client.post(
+        "/api/bookings",
+        json={
+            "serviceId": service.id,
+            "trainerId": trainers[sent_trainer].id,
+            "timeSlotId": slot.id,
+            "date": slot_date.isoformat(),
+        },
+    )
+    assert response.status_code == 200
+
+    after = test_client.get("/api/timeslots", params=params).json()
+    assert slot.id not in {item["id"] for item in after}
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.02)
+
+
+def test_notification_from_other_process_invalidates_cache(test_session):
+    cache = AvailabilityCache(max_entries=16, ttl=60)
+    key, tags = timeslots_entry(4, 2, DAY, TODAY)
+    change = SlotChange(4, None, 2, DAY)
+
+    async def scenario():
+        listener = asyncio.create_task(
+            listen(
+                TEST_DATABASE_URL,
+                {
+                    AVAILABILITY_CHANNEL: lambda payload: cache.invalidate(
+                        [SlotChange.from_payload(payload)]
+                    )
+                },
+                on_reset=cache.clear,
+            )
+        )
+        try:
+            # Слушатель очищает кэш после подписки на канал
+            await wait_for(lambda: cache.version > 0)
+            cache.put(key, ["cached"], tags, cache.version)
+            with engine.begin() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {
+                        "channel": AVAILABILITY_CHANNEL,
+                        "payload": change.to_payload(),
+                    },
+                )
+            await wait_for(lambda: len(cache) == 0)
+        finally:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+
+    asyncio.run(scenario())
+
+
+def test_startup_subscription_keeps_cache(test_session):
+    cache = AvailabilityCache(max_entries=16, ttl=60)
+    key, tags = timeslots_entry(4, 2, DAY, TODAY)
+    change = SlotChange(4, None, 2, DAY)
+
+    async def scenario():
+        cache.put(key, ["cached"], tags, cache.version)
+        listener = await start_listener(
+            TEST_DATABASE_URL,
+            {
+                AVAILABILITY_CHANNEL: lambda payload: cache.invalidate(
+                    [SlotChange.from_payload(payload)]
+                )
+            },
+            on_reset=cache.clear,
+        )
+        try:
+            # Первая подписка при старте не сбрасывает кэш
+            await asyncio.sleep(0.2)
+            assert len(cache) == 1
+            with engine.begin() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {
+                        "channel": AVAILABILITY_CHANNEL,
+                        "payload": change.to_payload(),
+                    },
+                )
+            await wait_for(lambda: len(cache) == 0)
+        finally:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+
+    asyncio.run(scenario())
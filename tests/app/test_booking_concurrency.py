@@ -0,0 +1,99 @@
+import asyncio
+
+from datetime import datetime, timedelta
+
+import httpx
+
+from sqlmodel import select
+
+from application.backend.main import app
+from utils.database import db
+from utils.models import Booking, GroupClass, Service, TimeSlot, Trainer
+
+PARALLEL_BOOKINGS = 300
+GROUP_SPOTS = 20
+
+
+async def post_bookings(payload, count):
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post("/api/bookings", json=payload)
+                    for _ in range(count)
+                )
+            )
+    finally:
+        await db.dispose()
+    return [response.status_code for response in responses]
+
+
+def create_slot(test_session, **fields):
+    trainer = test_session.execute(select(Trainer)).scalars().first()
+    slot = TimeSlot(
+        trainer_id=trainer.id,
+        dates=(datetime.now() + timedelta(days=3)).date(),
+        times=datetime.now().time(),
+        available=True,
+        **fields,
+    )
+    test_session.add(slot)
+    test_session.commit()
+    test_session.refresh(slot)
+    return slot
+
+
+def count_bookings(test_session, slot):
+    return len(
+        test_session.execute(
+            select(Booking).where(Booking.timeslot_id == slot.id)
+        )
+        .scalars()
+        .all()
+    )
+
+
+def test_parallel_group_bookings_never_oversell(test_session):
+    group = test_session.execute(select(GroupClass)).scalars().first()
+    slot = create_slot(
+        test_session, group_class_id=group.id, available_spots=GROUP_SPOTS
+    )
+    payload = {
+        "classId": group.id,
+        "timeSlotId": slot.id,
+        "date": slot.dates.isoformat(),
+        "name": "Параллельная запись",
+        "phone": "1234567890",
+        "email": "parallel@example.com",
+    }
+
+    statuses = asyncio.run(post_bookings(payload, PARALLEL_BOOKINGS))
+
+    assert statuses.count(200) == GROUP_SPOTS
+    assert statuses.count(400) == PARALLEL_BOOKINGS - GROUP_SPOTS
+    test_session.refresh(slot)
+    assert slot.available_spots == 0
+    assert slot.available is False
+    assert count_bookings(test_session, slot) == GROUP_SPOTS
+
+
+def test_parallel_individual_bookings_book_slot_once(test_session):
+    trainer = test_session.execute(select(Trainer)).scalars().first()
+    service = test_session.execute(select(Service)).scalars().first()
+    slot = create_slot(test_session, service_id=service.id)
+    payload = {
+        "serviceId": service.id,
+        "trainerId": trainer.id,
+        "timeSlotId": slot.id,
+        "date": slot.dates.isoformat(),
+    }
+
+    statuses = asyncio.run(post_bookings(payload, PARALLEL_BOOKINGS))
+
+    assert statuses.count(200) == 1
+    test_session.refresh(slot)
+    assert slot.available is False
+    assert count_bookings(test_session, slot) == 1
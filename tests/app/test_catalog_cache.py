@@ -0,0 +1,100 @@
+import pytest
+
+from prometheus_client import REGISTRY
+
+from utils.catalog_cache import catalog_cache, etag_matches
+from utils.compression import choose_encoding
+
+SERVICE_QUERIES = {
+    "operation": "select",
+    "table": "service",
+    "service": "application-backend",
+}
+
+
+def count_service_queries():
+    return REGISTRY.get_sample_value("db_queries_total", SERVICE_QUERIES) or 0
+
+
+def test_etag_comparison_is_weak():
+    etag = {'"abc"'}
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"old", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"old"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_catalog_conditional_get(test_client):
+    response = test_client.get("/api/services")
+    etag = response.headers["etag"]
+
+    assert response.status_code == 200
+    assert etag.startswith('"')
+    assert "max-age" in response.headers["cache-control"]
+
+    not_modified = test_client.get(
+        "/api/services", headers={"If-None-Match": etag}
+    )
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+
+# Включается после старта клиента: без слушателя уведомлений, который
+# сбрасывает кэш при подписке
+@pytest.fixture
+def enabled_catalog_cache(monkeypatch):
+    monkeypatch.setattr(catalog_cache, "enabled", True)
+    catalog_cache.clear()
+    yield catalog_cache
+    catalog_cache.clear()
+
+
+def test_repeat_requests_do_not_query_catalog(
+    test_client, enabled_catalog_cache
+):
+    first = test_client.get("/api/services")
+    before = count_service_queries()
+
+    repeat = test_client.get("/api/services")
+    revalidated = test_client.get(
+        "/api/services", headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert repeat.content == first.content
+    assert revalidated.status_code == 304
+    assert count_service_queries() == before
+
+
+def test_catalog_is_served_precompressed(test_client):
+    compressed = test_client.get(
+        "/api/services", headers={"Accept-Encoding": "gzip"}
+    )
+    plain = test_client.get(
+        "/api/services", headers={"Accept-Encoding": "identity"}
+    )
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"].endswith('-gzip"')
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    assert (
+        test_client.get(
+            "/api/services",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": plain.headers["etag"],
+            },
+        ).status_code
+        == 304
+    )
+
+
+def test_accept_encoding_respects_zero_quality():
+    assert choose_encoding("gzip;q=0, identity", {"gzip": b""}) is None
+    assert choose_encoding("deflate, gzip;q=0.5", {"gzip": b""}) == "gzip"
+    assert choose_encoding("*", {"gzip": b""}) == "gzip"
@@ -0,0 +1,93 @@
+import gzip
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from utils.compression import (
+    CompressedBodies,
+    CompressionMiddleware,
+    add_vary,
+)
+
+LARGE = {"description": "Описание занятия йогой. " * 200}
+
+
+def large(request):
+    return JSONResponse(LARGE, headers={"ETag": '"v1"'})
+
+
+def varied(request):
+    return JSONResponse(LARGE, headers={"Vary": request.query_params["vary"]})
+
+
+def small(request):
+    return JSONResponse({"ok": True})
+
+
+def stream(request):
+    return StreamingResponse(
+        iter([b"x" * 2048, b"y" * 2048]), media_type="text/plain"
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/large", large),
+        Route("/varied", varied),
+        Route("/small", small),
+        Route("/stream", stream),
+    ]
+)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+client = TestClient(app)
+
+
+def test_large_response_is_compressed_with_own_etag():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(
+        JSONResponse(LARGE).body
+    )
+    assert response.json() == LARGE
+
+
+def test_response_is_sent_as_is_when_not_accepted_or_small():
+    plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+    tiny = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == '"v1"'
+    assert "content-encoding" not in tiny.headers
+    assert "content-encoding" not in streamed.headers
+    assert len(streamed.content) == 4096
+
+
+def test_compressed_bodies_are_reused():
+    bodies = CompressedBodies(max_entries=1)
+    body = b"a" * 4096
+
+    first = bodies.compress("key", "gzip", body)
+
+    assert bodies.compress("key", "gzip", body) is first
+    assert gzip.decompress(first) == body
+    bodies.compress("other", "gzip", body)
+    assert bodies.compress("key", "gzip", body) is not first
+
+
+def test_vary_is_merged_into_existing_header():
+    origin = client.get(
+        "/varied?vary=Origin", headers={"Accept-Encoding": "gzip"}
+    )
+    already = client.get(
+        "/varied?vary=accept-encoding", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert origin.headers.get_list("vary") == ["Origin, Accept-Encoding"]
+    assert already.headers.get_list("vary") == ["accept-encoding"]
+    assert add_vary([(b"vary", b"*")]) == [(b"vary", b"*")]
@@ -0,0 +1,35 @@
+from prometheus_client import REGISTRY
+
+
+def get_sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_db_queries_are_tracked_per_table(test_client):
+    labels = {
+        "operation": "select",
+        "table": "service",
+        "service": "application-backend",
+    }
+    before = get_sample("db_queries_total", labels)
+
+    response = test_client.get("/api/services")
+
+    assert response.status_code == 200
+    assert get_sample("db_queries_total", labels) == before + 1
+    assert get_sample("db_query_duration_seconds_count", labels) >= 1
+
+
+def test_db_rows_returned_are_tracked_per_route(test_client):
+    labels = {
+        "route": "/api/services",
+        "table": "service",
+        "service": "application-backend",
+    }
+    before = get_sample("db_query_rows_returned_sum", labels)
+
+    response = test_client.get("/api/services")
+
+    assert response.status_code == 200
+    rows = get_sample("db_query_rows_returned_sum", labels) - before
+    assert rows == len(response.json())
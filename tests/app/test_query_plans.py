@@ -0,0 +1,166 @@
+import json
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from admin.backend.pagination import limit_page, project_page
+from admin.backend.timeslots import (
+    TIMESLOT_LIST_COLUMNS,
+    TIMESLOT_LIST_KEY,
+    TimeSlotListQuery,
+    list_timeslots,
+)
+from application.backend.availability import (
+    bookable_group_classes,
+    bookable_range,
+    bookable_timeslots,
+    bookable_trainers,
+)
+from application.backend.bookings import (
+    book_group_slot,
+    book_individual_slot,
+    booking_details,
+)
+from tests.app.conftest import engine
+
+SEED_DATE = date(2030, 1, 1)
+SEED_DAYS = 365
+
+SEED_SQL = """
+WITH trainers AS (
+    INSERT INTO trainer (name, specialization)
+    SELECT 'План ' || g, 'Хатха' FROM generate_series(1, 50) g
+    RETURNING id
+), services AS (
+    INSERT INTO service (name, type)
+    SELECT 'План ' || g, 'individual' FROM generate_series(1, 20) g
+    RETURNING id
+), classes AS (
+    INSERT INTO groupclass (name)
+    SELECT 'План ' || g FROM generate_series(1, 20) g
+    RETURNING id
+), slots AS (
+    INSERT INTO timeslot (
+        trainer_id, service_id, group_class_id, dates, times,
+        available, available_spots, created_at
+    )
+    SELECT
+        (SELECT min(id) FROM trainers) + g % 50,
+        CASE WHEN g % 2 = 0 THEN (SELECT min(id) FROM services) + g % 20 END,
+        CASE WHEN g % 2 = 1 THEN (SELECT min(id) FROM classes) + g % 20 END,
+        :start + g % :days,
+        time '08:00' + (g / :days) * interval '1 minute',
+        g % 3 <> 0,
+        CASE WHEN g % 2 = 1 THEN g % 10 END,
+        now()
+    FROM generate_series(1, 50000) g
+    RETURNING id, trainer_id, service_id, dates
+)
+INSERT INTO booking (service_id, trainer_id, timeslot_id, dates, created_at)
+SELECT service_id, trainer_id, id, dates,
+       now() - (id % 1000) * interval '1 minute'
+FROM slots WHERE service_id IS NOT NULL
+"""
+
+
+def with_params(statement_and_params):
+    statement, params = statement_and_params
+    return statement.params(**params)
+
+
+def hot_path_queries():
+    """Выражения, которые выполняют эндпоинты, с параметрами"""
+    day = SEED_DATE + timedelta(days=40)
+    today = SEED_DATE
+    booking = {"created_at": datetime(2030, 1, 1)}
+    return {
+        "timeslots": bookable_timeslots(3, 4, day, today),
+        "group-classes": bookable_group_classes(day, today),
+        "trainers-by-service": bookable_trainers(4, None, today),
+        "trainers-by-group-class": bookable_trainers(None, 5, today),
+        "range-by-service": bookable_range(
+            4, None, [3, 5], day, day + timedelta(days=30), today
+        ),
+        "range-by-group-class": bookable_range(
+            None, 5, None, day, day + timedelta(days=30), today
+        ),
+        "book-individual": with_params(
+            book_individual_slot(
+                1,
+                day,
+                4,
+                {"service_id": 4, "trainer_id": 3, "dates": day, **booking},
+                today,
+            )
+        ),
+        "book-group": with_params(
+            book_group_slot(
+                2,
+                day,
+                5,
+                {
+                    "class_id": 5,
+                    "dates": day,
+                    "user_name": "План",
+                    "user_phone": "+70000000000",
+                    "user_email": "plan@example.com",
+                    **booking,
+                },
+                today,
+            )
+        ),
+        "booking-details": booking_details(1),
+        "admin-times": admin_times_page(TimeSlotListQuery()),
+        "admin-times-trainer": admin_times_page(
+            TimeSlotListQuery(trainer_id=3, date_from=day)
+        ),
+    }
+
+
+def admin_times_page(query: TimeSlotListQuery):
+    _, statement = project_page(
+        list_timeslots(query), TIMESLOT_LIST_COLUMNS, TIMESLOT_LIST_KEY, query
+    )
+    return limit_page(statement, TIMESLOT_LIST_KEY, query)
+
+
+def seq_scanned_tables(plan):
+    """Таблицы, которые план читает последовательным сканированием"""
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables |= seq_scanned_tables(child)
+    return tables
+
+
+@pytest.fixture
+def seeded_connection(test_session):
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(
+            text(SEED_SQL), {"start": SEED_DATE, "days": SEED_DAYS}
+        )
+        connection.execute(text("ANALYZE timeslot, booking"))
+        yield connection
+        transaction.rollback()
+
+
+@pytest.mark.parametrize("name", list(hot_path_queries()))
+def test_hot_path_queries_use_indexes(seeded_connection, name):
+    statement = hot_path_queries()[name].compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True, "render_postcompile": True},
+    )
+
+    (plan,) = seeded_connection.execute(
+        text(f"EXPLAIN (FORMAT JSON) {statement}")
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)[0]
+
+    assert not seq_scanned_tables(plan["Plan"]) & {"timeslot", "booking"}
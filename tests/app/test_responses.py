@@ -0,0 +1,30 @@
+import json
+
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from utils.responses import dumps
+
+
+def test_dumps_matches_fastapi_encoding():
+    content = [
+        {
+            "id": 1,
+            "name": "Хатха-йога",
+            "date": date(2030, 5, 1),
+            "times": time(10, 30),
+            "created_at": datetime(2030, 4, 1, 9, 15, 30, 250),
+            "price": Decimal("1500"),
+            "photos": ["a.jpg"],
+            "description": None,
+        }
+    ]
+
+    assert dumps(content) == JSONResponse(jsonable_encoder(content)).body
+
+
+def test_dumps_accepts_integer_keys():
+    assert json.loads(dumps({7: {"name": "Анна"}})) == {"7": {"name": "Анна"}}
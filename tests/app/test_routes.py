@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 import pytest
 from sqlmodel import select
 
+from application.backend.booking_reference import sign_booking
 from utils.models import Booking, GroupClass, Service, TimeSlot, Trainer
 
 # Тесты
@@ -392,33 +393,29 @@ def test_get_booking_details(test_client, test_session):
     if booking_response.status_code != 200:
         pytest.skip("Не удалось создать бронирование")
 
-    # Проверяем детали бронирования
-    test_session.commit()
-    response = test_client.get("/api/booking-details")
+    # Проверяем детали бронирования по ссылке из ответа
+    response = test_client.get(
+        "/api/booking-details",
+        params={"reference": booking_response.json()["reference"]},
+    )
 
     assert response.status_code == 200
-    response_data = response.json()
-
-    # Проверяем структуру ответа
-    if "error" not in response_data:
-        assert "serviceName" in response_data
-        assert "trainerName" in response_data
-        assert "date" in response_data
-        assert "time" in response_data
-    else:
-        # Если сервер отвечает что бронирований нет
-        assert response_data["error"] == "No booking found"
+    assert response.json() == {
+        "serviceName": service.name,
+        "trainerName": trainer.name,
+        "date": booking_date,
+        "time": timeslot.times.isoformat(),
+    }
 
 
-def test_get_success_data_no_booking(test_client, test_session):
-    # Убедитесь, что таблица Booking пуста
-    test_session.query(Booking).delete()  # Удаляем все записи о бронировании
-    test_session.commit()  # Сохраняем изменения в базе данных
+def test_get_success_data_rejects_forged_reference(test_client):
+    reference = sign_booking(10**9)
+    forged = sign_booking(1)[:-2] + reference[-2:]
 
-    # Выполняем GET-запрос к эндпоинту
-    response = test_client.get("/api/booking-details")
+    for value in (forged, "not-a-reference", reference):
+        response = test_client.get(
+            "/api/booking-details", params={"reference": value}
+        )
 
-    # Проверка, что статус код 200
-    # и сообщение об ошибке соответствует ожиданиям
-    assert response.status_code == 200
-    assert response.json() == {"error": "No booking found"}
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Бронирование не найдено"}
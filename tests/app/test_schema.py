@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+from sqlalchemy import text
+
+from utils.config import settings
+from utils.database import SchemaVersionError, db, get_alembic_heads
+
+
+@pytest.fixture
+def alembic_version():
+    with db.engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        connection.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+        )
+    yield
+    with db.engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+
+
+def set_revision(revision):
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM alembic_version"))
+        connection.execute(
+            text("INSERT INTO alembic_version VALUES (:revision)"),
+            {"revision": revision},
+        )
+
+
+def test_verify_schema_fails_without_migrations():
+    with pytest.raises(SchemaVersionError):
+        db.prepare_schema("verify", settings.ALEMBIC_SCRIPT_LOCATION)
+
+
+def test_verify_schema_fails_on_old_revision(alembic_version):
+    set_revision("0000outdated")
+
+    with pytest.raises(SchemaVersionError):
+        db.prepare_schema("verify", settings.ALEMBIC_SCRIPT_LOCATION)
+
+
+def test_verify_schema_accepts_head_revision(alembic_version):
+    (head,) = get_alembic_heads(settings.ALEMBIC_SCRIPT_LOCATION)
+    set_revision(head)
+
+    db.prepare_schema("verify", settings.ALEMBIC_SCRIPT_LOCATION)
+
+
+def test_unknown_schema_mode_is_rejected():
+    with pytest.raises(ValueError):
+        db.prepare_schema("drop", settings.ALEMBIC_SCRIPT_LOCATION)
+
+
+def test_import_does_not_create_shared_db():
+    # auth импортирует Database и не должен создавать движки DATABASE_URL
+    code = (
+        "import utils.database as database; "
+        "assert database._db is None; "
+        "assert database.db is database.get_db()"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,79 @@
+"""Накладные расходы метрик на один HTTP-запрос.
+
+Запуск из корня репозитория:
+
+    python -m tests.benchmarks.metrics_overhead --iterations 200000
+
+Сравнивает прежний путь middleware (чтение окружения, ``time.time`` и
+``.labels(**kwargs)`` на каждый запрос) с ``MetricsRegistry``, где имя
+сервиса определено один раз, а дочерние метрики взяты из кэша.
+Результат выводится в наносекундах на запрос.
+"""
+
+import argparse
+import time
+
+from utils.metrics import (
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_TIME_TO_FIRST_BYTE,
+    REQUEST_COUNT,
+    REQUEST_LATENCY,
+    get_service_name,
+    metrics_registry,
+)
+
+METHOD = "GET"
+ENDPOINT = "/api/timeslots"
+STATUS = 200
+
+
+def legacy_path():
+    service = get_service_name()
+    start = time.time()
+    HTTP_REQUESTS_IN_PROGRESS.labels(service=service).inc()
+    first_byte_at = time.time()
+    HTTP_REQUESTS_IN_PROGRESS.labels(service=service).dec()
+    finished_at = time.time()
+    labels = {"method": METHOD, "endpoint": ENDPOINT, "service": service}
+    REQUEST_COUNT.labels(status=STATUS, **labels).inc()
+    REQUEST_LATENCY.labels(**labels).observe(finished_at - start)
+    HTTP_TIME_TO_FIRST_BYTE.labels(**labels).observe(first_byte_at - start)
+
+
+def registry_path():
+    start = time.perf_counter_ns()
+    in_progress = metrics_registry.labels(HTTP_REQUESTS_IN_PROGRESS)
+    in_progress.inc()
+    first_byte_at = time.perf_counter_ns()
+    in_progress.dec()
+    finished_at = time.perf_counter_ns()
+    children = metrics_registry.http(METHOD, ENDPOINT)
+    children.count(STATUS).inc()
+    children.latency.observe((finished_at - start) / 1e9)
+    children.first_byte.observe((first_byte_at - start) / 1e9)
+
+
+def measure(func, iterations):
+    for _ in range(1000):
+        func()
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    metrics_registry.set_service_name("benchmark")
+    legacy = measure(legacy_path, args.iterations)
+    registry = measure(registry_path, args.iterations)
+    print(f"legacy:   {legacy:8.0f} нс/запрос")
+    print(f"registry: {registry:8.0f} нс/запрос")
+    print(f"ускорение: {legacy / registry:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Сравнение пропускной способности /api/timeslots в sync и async режимах.
+
+Запуск из корня репозитория (нужен DATABASE_URL с тестовыми данными):
+
+    python -m tests.benchmarks.timeslots_sync_vs_async \
+        --requests 2000 --concurrency 10 --db-latency-ms 2
+
+Sync-режим воспроизводит прежний обработчик: ``async def`` с блокирующей
+``Session``, которая останавливает цикл событий на время запроса к БД.
+Async-режим использует боевой роутер приложения с ``AsyncSession``.
+
+``--db-latency-ms`` добавляет к каждому запросу сетевую задержку до БД:
+в sync-режиме она блокирует поток, в async-режиме уступает цикл событий,
+как это происходит с настоящим сетевым round-trip. При конкурентности
+выше ``pool_size + max_overflow`` sync-режим упирается в таймаут пула:
+соединения освобождаются только после ответа, а цикл событий заблокирован
+ожиданием свободного соединения.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from datetime import date
+from typing import Annotated
+
+import httpx
+
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+from sqlmodel import Session, select
+
+from application.backend.routes import router as async_router
+from utils.database import db
+from utils.models import TimeSlot
+
+SyncSessionDep = Annotated[Session, Depends(db.get_session)]
+
+
+def build_sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/timeslots")
+    async def return_timeslots_endpoint(
+        session: SyncSessionDep,
+        service_id: int,
+        trainer_id: int = Query(..., alias="trainerId"),
+        date: str = Query(..., format="date"),
+    ):
+        return session.exec(
+            select(TimeSlot).where(
+                TimeSlot.trainer_id == trainer_id,
+                TimeSlot.dates == date,
+                TimeSlot.service_id == service_id,
+            )
+        ).all()
+
+    return app
+
+
+def add_db_latency(latency: float):
+    def sync_latency(*args):
+        time.sleep(latency)
+
+    def async_latency(*args):
+        await_only(asyncio.sleep(latency))
+
+    event.listen(db.engine, "before_cursor_execute", sync_latency)
+    event.listen(
+        db.async_engine.sync_engine, "before_cursor_execute", async_latency
+    )
+
+
+def build_async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(async_router)
+    return app
+
+
+async def run_load(
+    app: FastAPI, params: dict, requests: int, concurrency: int
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(
+                        "/api/timeslots", params=params
+                    )
+                    response.raise_for_status()
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        # Прогрев пула соединений
+        await asyncio.gather(*(one_request() for _ in range(concurrency)))
+        latencies.clear()
+        errors = 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace):
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms / 1000)
+    params = {
+        "service_id": args.service_id,
+        "trainerId": args.trainer_id,
+        "date": args.date,
+    }
+    sync_result = await run_load(
+        build_sync_app(), params, args.requests, args.concurrency
+    )
+    async_result = await run_load(
+        build_async_app(), params, args.requests, args.concurrency
+    )
+    await db.dispose()
+
+    print(
+        f"concurrency={args.concurrency} "
+        f"db_latency_ms={args.db_latency_ms}"
+    )
+    for mode, result in (("sync", sync_result), ("async", async_result)):
+        print(f"{mode:>6}: {result}")
+    print(f"speedup: {async_result['rps'] / sync_result['rps']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--service-id", type=int, default=1)
+    parser.add_argument("--trainer-id", type=int, default=1)
+    parser.add_argument("--date", default=date.today().isoformat())
+    asyncio.run(main(parser.parse_args()))
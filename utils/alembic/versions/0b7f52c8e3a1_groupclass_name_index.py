@@ -0,0 +1,42 @@
+"""Index on groupclass name
+
+Revision ID: 0b7f52c8e3a1
+Revises: d6cea149084c
+Create Date: 2026-10-18 23:02:17.441860
+
+Админка находит групповое занятие слота по имени, как тренера и услугу,
+у которых индекс по имени уже есть.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0b7f52c8e3a1"
+down_revision: Union[str, None] = "d6cea149084c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_groupclass_name",
+            "groupclass",
+            ["name"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_groupclass_name",
+            table_name="groupclass",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
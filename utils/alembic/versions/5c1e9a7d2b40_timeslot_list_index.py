@@ -0,0 +1,43 @@
+"""Index for admin timeslot list pages
+
+Revision ID: 5c1e9a7d2b40
+Revises: 0b7f52c8e3a1
+Create Date: 2026-10-19 00:14:52.630917
+
+Список слотов в админке отдается страницами по ключу
+``(dates, times, id)``: страница читает из индекса только свои строки,
+без сортировки всей таблицы.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1e9a7d2b40"
+down_revision: Union[str, None] = "0b7f52c8e3a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_timeslot_dates_times_id",
+            "timeslot",
+            ["dates", "times", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_timeslot_dates_times_id",
+            table_name="timeslot",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,72 @@
+"""Booking hot path indexes
+
+Revision ID: 6a2349d4ddc7
+Revises: a293ae924797
+Create Date: 2026-10-18 19:22:06.746904
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6a2349d4ddc7"
+down_revision: Union[str, None] = "a293ae924797"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Частичные индексы по свободным слотам: имя -> колонки
+TIMESLOT_INDEXES = {
+    "ix_timeslot_trainer_date_service_available": [
+        "trainer_id",
+        "dates",
+        "service_id",
+    ],
+    "ix_timeslot_date_group_class_available": ["dates", "group_class_id"],
+    "ix_timeslot_service_date_available": ["service_id", "dates"],
+    "ix_timeslot_group_class_date_available": ["group_class_id", "dates"],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы на время построения
+    with op.get_context().autocommit_block():
+        for name, columns in TIMESLOT_INDEXES.items():
+            op.create_index(
+                name,
+                "timeslot",
+                columns,
+                unique=False,
+                postgresql_where=sa.text("available"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.create_index(
+            "ix_booking_created_at",
+            "booking",
+            ["created_at"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_booking_created_at",
+            table_name="booking",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        for name in reversed(TIMESLOT_INDEXES):
+            op.drop_index(
+                name,
+                table_name="timeslot",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,44 @@
+"""Drop unused booking created_at index
+
+Revision ID: 8f3d6b2a91c5
+Revises: 5c1e9a7d2b40
+Create Date: 2026-10-19 01:05:37.218406
+
+``ix_booking_created_at`` создавался под выборку последних бронирований,
+но ни один запрос не сортирует и не фильтрует бронирования по дате
+создания: детали бронирования читаются по первичному ключу. Индекс
+только замедлял вставку бронирования.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8f3d6b2a91c5"
+down_revision: Union[str, None] = "5c1e9a7d2b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_booking_created_at",
+            table_name="booking",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_booking_created_at",
+            "booking",
+            ["created_at"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
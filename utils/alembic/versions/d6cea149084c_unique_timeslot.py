@@ -0,0 +1,98 @@
+"""Unique timeslot per trainer, target, date and time
+
+Revision ID: d6cea149084c
+Revises: e444f1d1e29f
+Create Date: 2026-10-18 22:10:41.903215
+
+Уникальный индекс нужен массовому созданию слотов (``ON CONFLICT DO
+NOTHING``). Перед его созданием повторяющиеся слоты объединяются в слот
+с наименьшим id: бронирования переносятся на него, слот остается
+открытым, только если были открыты все повторы, а мест в нем остается
+наименьшее из всех повторов.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d6cea149084c"
+down_revision: Union[str, None] = "e444f1d1e29f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "uq_timeslot_trainer_date_time_target"
+INDEX_COLUMNS = [
+    "trainer_id",
+    "dates",
+    "times",
+    sa.text("coalesce(service_id, 0)"),
+    sa.text("coalesce(group_class_id, 0)"),
+]
+
+MERGE_DUPLICATES = [
+    """
+    CREATE TEMPORARY TABLE timeslot_duplicate ON COMMIT DROP AS
+    SELECT id, keep_id FROM (
+        SELECT id, min(id) OVER (
+            PARTITION BY trainer_id, dates, times,
+                coalesce(service_id, 0), coalesce(group_class_id, 0)
+        ) AS keep_id
+        FROM timeslot
+    ) slots
+    WHERE id <> keep_id
+    """,
+    """
+    UPDATE booking SET timeslot_id = duplicate.keep_id
+    FROM timeslot_duplicate AS duplicate
+    WHERE booking.timeslot_id = duplicate.id
+    """,
+    """
+    UPDATE timeslot SET
+        available = timeslot.available AND merged.available,
+        available_spots = LEAST(
+            timeslot.available_spots, merged.available_spots
+        )
+    FROM (
+        SELECT
+            duplicate.keep_id,
+            bool_and(slot.available) AS available,
+            min(slot.available_spots) AS available_spots
+        FROM timeslot_duplicate AS duplicate
+        JOIN timeslot AS slot ON slot.id = duplicate.id
+        GROUP BY duplicate.keep_id
+    ) AS merged
+    WHERE timeslot.id = merged.keep_id
+    """,
+    """
+    DELETE FROM timeslot USING timeslot_duplicate AS duplicate
+    WHERE timeslot.id = duplicate.id
+    """,
+]
+
+
+def upgrade() -> None:
+    for statement in MERGE_DUPLICATES:
+        op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            "timeslot",
+            INDEX_COLUMNS,
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name="timeslot",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
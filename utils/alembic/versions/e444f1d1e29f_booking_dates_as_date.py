@@ -0,0 +1,174 @@
+"""Booking dates as date, foreign keys and lookup indexes
+
+Revision ID: e444f1d1e29f
+Revises: 6a2349d4ddc7
+Create Date: 2026-10-18 21:04:12.518337
+
+``booking.dates`` хранил дату строкой, присланной клиентом. Колонка
+заменяется на ``DATE``: новая колонка заполняется пачками по
+``BATCH_SIZE`` строк, каждая пачка фиксируется отдельно и не держит
+блокировки на всю таблицу. Дата берется из слота бронирования, если слот
+удален — из строки в формате ISO, иначе из даты создания бронирования.
+Строка разбирается функцией ``booking_text_to_date``, которая
+возвращает NULL для несуществующей даты (``2024-02-30``) вместо ошибки,
+поэтому такая строка не прерывает миграцию.
+Под блокировкой таблицы выполняются только дозаполнение строк,
+вставленных во время миграции, и замена колонок.
+
+Внешние ключи создаются ``NOT VALID`` до заполнения, поэтому новые
+строки проверяются сразу, а существующие проверяются ``VALIDATE`` в
+конце без блокировки записи. Ссылки на удаленные записи при заполнении
+обнуляются: бронирование хранит историю и переживает удаление слота,
+тренера, услуги или занятия (``ON DELETE SET NULL``), поэтому
+``timeslot_id`` становится nullable. Перед откатом удалите бронирования
+без слота.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e444f1d1e29f"
+down_revision: Union[str, None] = "6a2349d4ddc7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Внешние ключи бронирования: колонка -> таблица
+BOOKING_FOREIGN_KEYS = {
+    "timeslot_id": "timeslot",
+    "trainer_id": "trainer",
+    "service_id": "service",
+    "class_id": "groupclass",
+}
+
+# Бронирования на день, на день тренера и слота (для ON DELETE)
+BOOKING_INDEXES = {
+    "ix_booking_dates": ["dates"],
+    "ix_booking_trainer_id_dates": ["trainer_id", "dates"],
+    "ix_booking_timeslot_id": ["timeslot_id"],
+}
+
+# Дата из строки ISO или NULL, если такой даты нет; существует только
+# на время заполнения
+TEXT_TO_DATE = "booking_text_to_date"
+CREATE_TEXT_TO_DATE = rf"""
+CREATE FUNCTION {TEXT_TO_DATE}(value text) RETURNS date
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    IF value !~ '^\d{{4}}-\d{{2}}-\d{{2}}$' THEN
+        RETURN NULL;
+    END IF;
+    RETURN CAST(value AS date);
+EXCEPTION
+    WHEN datetime_field_overflow OR invalid_datetime_format THEN
+        RETURN NULL;
+END
+$$
+"""
+
+BACKFILL_SET = f"""
+UPDATE booking SET
+    dates_new = COALESCE(
+        (SELECT dates FROM timeslot WHERE id = booking.timeslot_id),
+        {TEXT_TO_DATE}(booking.dates),
+        CAST(booking.created_at AS date)
+    ),
+    timeslot_id = (SELECT id FROM timeslot WHERE id = booking.timeslot_id),
+    trainer_id = (SELECT id FROM trainer WHERE id = booking.trainer_id),
+    service_id = (SELECT id FROM service WHERE id = booking.service_id),
+    class_id = (SELECT id FROM groupclass WHERE id = booking.class_id)
+"""
+
+# Пачка строк после :after, возвращает последний id пачки
+BACKFILL_BATCH = sa.text(
+    f"""
+WITH batch AS (
+    SELECT id FROM booking WHERE id > :after ORDER BY id LIMIT :limit
+), updated AS (
+    {BACKFILL_SET} FROM batch WHERE booking.id = batch.id
+)
+SELECT max(id) FROM batch
+"""
+)
+
+BACKFILL_REST = f"{BACKFILL_SET} WHERE dates_new IS NULL"
+
+
+def foreign_key_name(column: str) -> str:
+    return f"booking_{column}_fkey"
+
+
+def upgrade() -> None:
+    op.alter_column("booking", "timeslot_id", nullable=True)
+    op.add_column("booking", sa.Column("dates_new", sa.Date()))
+    for column, table in BOOKING_FOREIGN_KEYS.items():
+        op.create_foreign_key(
+            foreign_key_name(column),
+            "booking",
+            table,
+            [column],
+            ["id"],
+            ondelete="SET NULL",
+            postgresql_not_valid=True,
+        )
+    op.execute(CREATE_TEXT_TO_DATE)
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = 0
+        while last_id is not None:
+            last_id = bind.execute(
+                BACKFILL_BATCH, {"after": last_id, "limit": BATCH_SIZE}
+            ).scalar()
+
+    # Строки, вставленные во время заполнения, и замена колонки
+    op.execute("LOCK TABLE booking IN ACCESS EXCLUSIVE MODE")
+    op.execute(BACKFILL_REST)
+    op.execute(f"DROP FUNCTION {TEXT_TO_DATE}(text)")
+    op.alter_column("booking", "dates_new", nullable=False)
+    op.drop_column("booking", "dates")
+    op.alter_column("booking", "dates_new", new_column_name="dates")
+
+    with op.get_context().autocommit_block():
+        for column in BOOKING_FOREIGN_KEYS:
+            op.execute(
+                f"ALTER TABLE booking VALIDATE CONSTRAINT "
+                f"{foreign_key_name(column)}"
+            )
+        for name, columns in BOOKING_INDEXES.items():
+            op.create_index(
+                name,
+                "booking",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in reversed(BOOKING_INDEXES):
+            op.drop_index(
+                name,
+                table_name="booking",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    for column in reversed(BOOKING_FOREIGN_KEYS):
+        op.drop_constraint(
+            foreign_key_name(column), "booking", type_="foreignkey"
+        )
+    op.alter_column(
+        "booking",
+        "dates",
+        type_=sa.String(),
+        postgresql_using="to_char(dates, 'YYYY-MM-DD')",
+    )
+    op.alter_column("booking", "timeslot_id", nullable=False)
@@ -0,0 +1,270 @@
+"""Кэш свободных слотов с точной инвалидацией между процессами.
+
+Ответы ``/api/timeslots``, ``/api/trainers`` и ``/api/group-classes``
+хранятся в ограниченном LRU внутри процесса. Каждая запись помечена
+тегами — какими слотами (услуга или групповое занятие, тренер, дата)
+она определяется. Изменение слота (``SlotChange``) удаляет только записи
+с совпадающими тегами.
+
+Об изменениях слотов процессы узнают через PostgreSQL ``NOTIFY`` на
+канале ``AVAILABILITY_CHANNEL`` (см. ``utils.notifications``) и при
+потере соединения с ``LISTEN`` очищают кэш целиком. Без PostgreSQL
+инвалидация работает только внутри процесса.
+
+Запись, прочитанная из БД до инвалидации, не сохраняется после нее:
+``put`` принимает версию кэша, взятую до запроса к БД.
+"""
+
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import date
+from typing import NamedTuple
+
+from utils.config import settings
+from utils.metrics import (
+    set_cache_entries,
+    track_cache_evictions,
+    track_cache_lookup,
+)
+from utils.notifications import notify
+
+AVAILABILITY_CHANNEL = "availability"
+
+
+class SlotChange(NamedTuple):
+    """Положение слота, которое затронуло изменение"""
+
+    service_id: int | None
+    group_class_id: int | None
+    trainer_id: int | None
+    date: date
+
+    @classmethod
+    def of(cls, slot) -> "SlotChange":
+        return cls(
+            slot.service_id, slot.group_class_id, slot.trainer_id, slot.dates
+        )
+
+    def to_payload(self) -> str:
+        return json.dumps({**self._asdict(), "date": self.date.isoformat()})
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "SlotChange":
+        data = json.loads(payload)
+        return cls(
+            data["service_id"],
+            data["group_class_id"],
+            data["trainer_id"],
+            date.fromisoformat(data["date"]),
+        )
+
+    def tags(self) -> set[tuple]:
+        """Теги записей кэша, которые зависят от этого слота"""
+        tags = {("all-trainers",)}
+        if self.service_id is not None:
+            tags.add(("service-trainers", self.service_id))
+            tags.add(
+                ("service-slots", self.service_id, self.trainer_id, self.date)
+            )
+        if self.group_class_id is not None:
+            tags.add(("group-trainers", self.group_class_id))
+            tags.add(("group-slots", self.date))
+        return tags
+
+
+def timeslots_entry(
+    service_id: int, trainer_id: int, slot_date: date, today: date
+):
+    """Ключ и теги ответа /api/timeslots"""
+    return (
+        ("timeslots", service_id, trainer_id, slot_date, today),
+        {("service-slots", service_id, trainer_id, slot_date)},
+    )
+
+
+def group_classes_entry(slot_date: date, today: date, shape: str = "rows"):
+    """Ключ и теги ответа /api/group-classes"""
+    return (
+        ("group-classes", slot_date, today, shape),
+        {("group-slots", slot_date)},
+    )
+
+
+def trainers_entry(
+    service_id: int | None, group_class_id: int | None, today: date
+):
+    """Ключ и теги ответа /api/trainers"""
+    tags = set()
+    if service_id:
+        tags.add(("service-trainers", service_id))
+    if group_class_id:
+        tags.add(("group-trainers", group_class_id))
+    return (
+        ("trainers", service_id or None, group_class_id or None, today),
+        tags or {("all-trainers",)},
+    )
+
+
+def booking_details_entry(booking_id: int):
+    """Ключ и теги ответа /api/booking-details.
+
+    Детали бронирования после создания не меняются, запись живет
+    ``BOOKING_DETAILS_CACHE_TTL`` и не инвалидируется изменениями слотов.
+    """
+    return ("booking-details", booking_id), set()
+
+
+class CacheEntry:
+    __slots__ = ("value", "tags", "expires_at")
+
+    def __init__(self, value, tags, expires_at):
+        self.value = value
+        self.tags = tags
+        self.expires_at = expires_at
+
+
+class AvailabilityCache:
+    """LRU ответов о свободных слотах с инвалидацией по тегам.
+
+    Размер 0 отключает кэш: ``get_or_load`` всегда обращается к БД.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags: dict[tuple, set] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Значение из кэша или None при промахе"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                track_cache_evictions("expired")
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        track_cache_lookup(key[0], hit=entry is not None)
+        return entry.value if entry is not None else None
+
+    def put(
+        self,
+        key,
+        value,
+        tags: set[tuple],
+        version: int,
+        ttl: float | None = None,
+    ):
+        """Сохранение значения, прочитанного при версии ``version``"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # Слоты менялись, пока шел запрос к БД: значение могло устареть
+            if version != self._version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                value, tags, time.monotonic() + (ttl or self.ttl)
+            )
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            track_cache_evictions("size", evicted)
+        set_cache_entries(size)
+
+    async def get_or_load(
+        self,
+        key,
+        tags: set[tuple],
+        load: Callable[[], Awaitable],
+        ttl: float | None = None,
+    ):
+        """Значение из кэша или результат ``load``, сохраненный в кэш.
+
+        ``None`` из ``load`` не сохраняется. ``ttl`` задает срок жизни
+        записи вместо срока кэша.
+        """
+        if not self.enabled:
+            return await load()
+        value = self.get(key)
+        if value is None:
+            version = self._version
+            value = await load()
+            if value is not None:
+                self.put(key, value, tags, version, ttl)
+        return value
+
+    def invalidate(self, changes: Iterable[SlotChange]):
+        """Удаление записей, зависящих от измененных слотов"""
+        tags = set().union(*(change.tags() for change in changes))
+        with self._lock:
+            self._version += 1
+            keys = set().union(*(self._tags.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            size = len(self._entries)
+        if keys:
+            track_cache_evictions("invalidated", len(keys))
+        set_cache_entries(size)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            count = len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+        if count:
+            track_cache_evictions("invalidated", count)
+        set_cache_entries(0)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+availability_cache = AvailabilityCache(
+    settings.AVAILABILITY_CACHE_SIZE, settings.AVAILABILITY_CACHE_TTL
+)
+
+
+async def notify_slot_changes(session, changes: Iterable[SlotChange]):
+    """Уведомление об изменении слотов в текущей транзакции"""
+    await notify(
+        session,
+        AVAILABILITY_CHANNEL,
+        (change.to_payload() for change in changes),
+    )
+
+
+def apply_slot_change(payload: str):
+    """Обработчик уведомления канала ``AVAILABILITY_CHANNEL``"""
+    availability_cache.invalidate([SlotChange.from_payload(payload)])
@@ -0,0 +1,223 @@
+"""Снимок справочников, заранее сериализованный и сжатый в памяти.
+
+Справочники (услуги, тренеры, групповые занятия, филиал) меняются
+несколько раз в месяц, а описания в них занимают килобайты. При старте
+воркера все справочники читаются из БД, кодируются в JSON и сжимаются
+(см. ``utils.compression``) один раз, а эндпоинты отдают готовые байты
+без запросов к БД, ORM и сериализации.
+
+Снимок неизменяем и заменяется целиком одним присваиванием, поэтому
+запрос всегда видит согласованную версию справочника. ETag — хэш тела,
+одинаковый во всех воркерах и сервисах; повторный запрос с
+``If-None-Match`` получает ``304``.
+
+Изменяющие справочник запросы отправляют ``NOTIFY`` на канале
+``CATALOG_CHANNEL`` с именем справочника (см. ``utils.notifications``).
+Процесс, получивший уведомление, убирает справочник из снимка и
+перестраивает его в фоне; запрос, пришедший раньше, читает его из БД сам.
+У филиала нет изменяющих API, после правки в БД отправьте уведомление
+вручную: ``SELECT pg_notify('catalog', 'branch')``.
+"""
+
+import asyncio
+import hashlib
+import logging
+
+from typing import NamedTuple
+
+from sqlmodel import select
+from starlette.requests import Request
+from starlette.responses import Response
+
+from utils.compression import choose_encoding, compress_all, encoded_etag
+from utils.config import settings
+from utils.database import db
+from utils.models import Branch, GroupClass, Service, Trainer
+from utils.notifications import notify
+from utils.responses import json_response, rows_to_json
+
+logger = logging.getLogger("yoga.catalog_cache")
+
+CATALOG_CHANNEL = "catalog"
+
+CATALOG_QUERIES = {
+    name: select(*model.__table__.columns)
+    for name, model in (
+        ("services", Service),
+        ("trainers", Trainer),
+        ("groups", GroupClass),
+        ("branch", Branch),
+    )
+}
+CATALOGS = tuple(CATALOG_QUERIES)
+
+# Публичные справочники можно кэшировать в nginx и браузере, админские
+# ответы только в браузере и с проверкой на каждый запрос
+PUBLIC_CACHE_CONTROL = (
+    f"public, max-age={settings.CATALOG_MAX_AGE}, must-revalidate"
+)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+class CatalogEntry(NamedTuple):
+    """Справочник в JSON и в сжатых вариантах с их ETag"""
+
+    body: bytes
+    etag: str
+    encoded: dict[str, bytes]
+
+    def etag_for(self, encoding: str | None) -> str:
+        if encoding is None:
+            return self.etag
+        return encoded_etag(self.etag, encoding)
+
+    def etags(self) -> set[str]:
+        return {self.etag_for(None), *map(self.etag_for, self.encoded)}
+
+
+def make_entry(body: bytes) -> CatalogEntry:
+    """Справочник с ETag и сжатыми вариантами из тела JSON"""
+    return CatalogEntry(
+        body,
+        '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        compress_all(body),
+    )
+
+
+def etag_matches(if_none_match: str | None, etags: set[str]) -> bool:
+    """Слабое сравнение ``If-None-Match`` с ETag (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") in etags
+        for candidate in if_none_match.split(",")
+    )
+
+
+async def load_entries(names) -> dict[str, CatalogEntry]:
+    """Чтение справочников из БД одной сессией"""
+    async with db.async_session_maker() as session:
+        return {
+            name: make_entry(
+                rows_to_json((await session.exec(CATALOG_QUERIES[name])).all())
+            )
+            for name in names
+        }
+
+
+class CatalogCache:
+    """Снимок справочников процесса.
+
+    Выключенный кэш читает справочник на каждый запрос, ETag и ``304``
+    при этом продолжают работать.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._entries: dict[str, CatalogEntry] = {}
+        self._versions = dict.fromkeys(CATALOGS, 0)
+        self._refreshes: set[asyncio.Task] = set()
+
+    async def get(self, name: str) -> CatalogEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = (await self.refresh([name]))[name]
+        return entry
+
+    async def refresh(self, names=CATALOGS) -> dict[str, CatalogEntry]:
+        """Перестроение справочников и замена снимка"""
+        versions = {name: self._versions[name] for name in names}
+        entries = await load_entries(names)
+        if self.enabled:
+            # Справочник, изменившийся во время чтения, не сохраняется
+            self._entries = {
+                **self._entries,
+                **{
+                    name: entry
+                    for name, entry in entries.items()
+                    if versions[name] == self._versions[name]
+                },
+            }
+        return entries
+
+    def invalidate(self, name: str):
+        if name not in self._versions:
+            raise ValueError(f"Неизвестный справочник '{name}'")
+        self._versions[name] += 1
+        self._entries = {
+            key: entry for key, entry in self._entries.items() if key != name
+        }
+        self._schedule_refresh([name])
+
+    def clear(self):
+        for name in self._versions:
+            self._versions[name] += 1
+        self._entries = {}
+        self._schedule_refresh(CATALOGS)
+
+    def _schedule_refresh(self, names):
+        if not self.enabled:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self.refresh(names)
+            )
+        except RuntimeError:
+            # Вне event loop снимок перестроится при следующем запросе
+            return
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Не удалось перестроить справочники",
+                exc_info=task.exception(),
+            )
+
+    async def close(self):
+        """Отмена фоновых перестроений при остановке процесса"""
+        for task in list(self._refreshes):
+            task.cancel()
+        await asyncio.gather(*self._refreshes, return_exceptions=True)
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_ENABLED)
+
+
+async def catalog_response(
+    request: Request,
+    name: str,
+    cache_control: str = PUBLIC_CACHE_CONTROL,
+) -> Response:
+    """Ответ справочником или ``304``, если у клиента та же версия"""
+    entry = await catalog_cache.get(name)
+    encoding = choose_encoding(
+        request.headers.get("accept-encoding"), entry.encoded
+    )
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etags()):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        body = entry.body
+    else:
+        body = entry.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return json_response(body, headers=headers)
+
+
+async def notify_catalog_change(session, *names: str):
+    """Уведомление об изменении справочников в текущей транзакции"""
+    await notify(session, CATALOG_CHANNEL, names)
+
+
+def apply_catalog_change(payload: str):
+    """Обработчик уведомления канала ``CATALOG_CHANNEL``"""
+    catalog_cache.invalidate(payload)
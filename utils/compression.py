@@ -0,0 +1,243 @@
+"""Сжатие тел ответов и выбор кодировки по ``Accept-Encoding``.
+
+gzip доступен всегда, brotli — если установлен пакет ``brotli``.
+Заранее подготовленные тела (снимок справочников) сжимаются с
+максимальной степенью, а ответы в ``CompressionMiddleware`` — с
+умеренной, так как это происходит на каждый запрос.
+"""
+
+import gzip
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Кодировки в порядке предпочтения сервера: (заранее, на лету)
+GZIP_ENCODERS = (
+    lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+    lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+)
+ENCODERS = {"gzip": GZIP_ENCODERS}
+if brotli is not None:
+    ENCODERS = {
+        "br": (
+            lambda body: brotli.compress(body, quality=11),
+            lambda body: brotli.compress(body, quality=5),
+        ),
+        **ENCODERS,
+    }
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+def compress_all(body: bytes) -> dict[str, bytes]:
+    """Тело во всех доступных кодировках, если сжатие его уменьшает"""
+    encoded = {}
+    for encoding, (compress, _) in ENCODERS.items():
+        data = compress(body)
+        if len(data) < len(body):
+            encoded[encoding] = data
+    return encoded
+
+
+def parse_accept_encoding(header: str | None) -> set[str]:
+    """Кодировки, которые принимает клиент (с ненулевым q)"""
+    accepted = set()
+    for item in (header or "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        if not encoding:
+            continue
+        q = params.strip().removeprefix("q=")
+        if params and q.replace(".", "", 1).isdigit() and float(q) == 0:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header: str | None, available) -> str | None:
+    """Предпочтительная для сервера кодировка из принятых клиентом"""
+    accepted = parse_accept_encoding(header)
+    for encoding in ENCODERS:
+        if encoding in available and (
+            encoding in accepted or "*" in accepted
+        ):
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Строгий ETag сжатого представления: свой для каждой кодировки"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def add_vary(headers: list, token: bytes = b"Accept-Encoding") -> list:
+    """Заголовки ответа с ``token`` в Vary.
+
+    ``token`` дописывается в имеющийся Vary (например, ``Origin`` от
+    CORS), а не вторым заголовком, и не добавляется повторно.
+    """
+    vary = [
+        index for index, (name, _) in enumerate(headers) if name == b"vary"
+    ]
+    tokens = {
+        item.strip().lower()
+        for index in vary
+        for item in headers[index][1].split(b",")
+    }
+    if token.lower() in tokens or b"*" in tokens:
+        return headers
+    if not vary:
+        return [*headers, (b"vary", token)]
+    index = vary[0]
+    headers = list(headers)
+    value = headers[index][1].strip()
+    headers[index] = (b"vary", value + b", " + token if value else token)
+    return headers
+
+
+class CompressedBodies:
+    """LRU сжатых тел повторяющихся ответов по ETag или хэшу тела"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compress(self, key, encoding: str, body: bytes) -> bytes:
+        if key is None or self.max_entries <= 0:
+            return ENCODERS[encoding][1](body)
+        cache_key = (key, encoding)
+        with self._lock:
+            data = self._bodies.get(cache_key)
+            if data is not None:
+                self._bodies.move_to_end(cache_key)
+                return data
+        data = ENCODERS[encoding][1](body)
+        with self._lock:
+            self._bodies[cache_key] = data
+            if len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+        return data
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов gzip/brotli.
+
+    Сжимаются ответы сжимаемых типов не меньше ``minimum_size`` байт, если
+    клиент принимает одну из кодировок. Ответы с ``Content-Encoding``
+    (заранее сжатые) и потоковые ответы передаются как есть. Сжатые тела
+    успешных GET-ответов сохраняются по ETag ответа или хэшу тела, и
+    повторный такой же ответ не сжимается заново.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, cache_size: int = 512):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.bodies = CompressedBodies(cache_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        # Ключ сжатых тел ответа: путь и ETag, для GET без ETag — хэш тела
+        cache_key = None
+        if scope["method"] == "GET":
+            cache_key = (scope["path"], scope["query_string"])
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                # Потоковый ответ не буферизуется
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            await self.send_response(
+                send, start_message, message.get("body", b""),
+                accept_encoding, cache_key,
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def send_response(
+        self, send, start, body, accept_encoding, cache_key
+    ):
+        headers = [
+            (name, value) for name, value in start["headers"]
+            if name != b"content-length"
+        ]
+        lookup = {name: value for name, value in headers}
+        content_type = lookup.get(b"content-type", b"").decode("latin-1")
+        cache_control = lookup.get(b"cache-control", b"")
+
+        if (
+            len(body) < self.minimum_size
+            or b"content-encoding" in lookup
+            or b"no-transform" in cache_control
+            or not is_compressible(content_type)
+        ):
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = add_vary(headers)
+        encoding = choose_encoding(accept_encoding, ENCODERS)
+        if encoding is not None:
+            key = None
+            if cache_key is not None and start["status"] == 200:
+                etag = lookup.get(b"etag")
+                if etag is not None:
+                    key = (*cache_key, etag)
+                else:
+                    key = hashlib.blake2b(body, digest_size=16).digest()
+            compressed = self.bodies.compress(key, encoding, body)
+            if len(compressed) < len(body):
+                body = compressed
+                headers = [
+                    (name, value) for name, value in headers
+                    if name != b"etag"
+                ]
+                headers.append((b"content-encoding", encoding.encode()))
+                if b"etag" in lookup:
+                    etag = encoded_etag(
+                        lookup[b"etag"].decode("latin-1"), encoding
+                    )
+                    headers.append((b"etag", etag.encode("latin-1")))
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -21,7 +21,76 @@ class Settings(BaseSettings):
     ADMIN_BACKEND_PORT: str = os.getenv("ADMIN_BACKEND_PORT", "5001")
     ADMIN_FRONTEND_PORT: str = os.getenv("ADMIN_FRONTEND_PORT", "3003")
     PYTHONPATH: str = os.getenv("PYTHONPATH", "/home/runner/work/Yoga/Yoga")
-    ECHO_SQL: bool = os.getenv("ECHO_SQL", "True").lower() == "true"
+    ECHO_SQL: bool = os.getenv("ECHO_SQL", "False").lower() == "true"
+
+    # Настройки пула соединений с БД
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = (
+        os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    )
+
+    # Журнал запросов к БД: медленные запросы и выборка остальных
+    SLOW_QUERY_THRESHOLD_MS: float = float(
+        os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")
+    )
+    QUERY_LOG_SAMPLE_RATE: float = float(
+        os.getenv("QUERY_LOG_SAMPLE_RATE", "0.0")
+    )
+
+    # Кэш свободных слотов: размер 0 отключает кэш, TTL ограничивает
+    # устаревание данных справочников (имена тренеров, занятий)
+    AVAILABILITY_CACHE_SIZE: int = int(
+        os.getenv("AVAILABILITY_CACHE_SIZE", "2048")
+    )
+    AVAILABILITY_CACHE_TTL: float = float(
+        os.getenv("AVAILABILITY_CACHE_TTL", "300")
+    )
+
+    # Ключ подписи ссылок на бронирования (по умолчанию выводится из
+    # POSTGRES_PASSWORD) и срок кэширования деталей бронирования
+    BOOKING_REFERENCE_SECRET: str = os.getenv("BOOKING_REFERENCE_SECRET", "")
+    BOOKING_DETAILS_CACHE_TTL: float = float(
+        os.getenv("BOOKING_DETAILS_CACHE_TTL", "30")
+    )
+
+    # Снимки справочников в процессе и срок кэширования ответов с ними
+    # в nginx и браузере
+    CATALOG_CACHE_ENABLED: bool = (
+        os.getenv("CATALOG_CACHE_ENABLED", "True").lower() == "true"
+    )
+    CATALOG_MAX_AGE: int = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+    # Размер страницы админских списков по умолчанию и наибольший
+    ADMIN_PAGE_SIZE: int = int(os.getenv("ADMIN_PAGE_SIZE", "100"))
+    ADMIN_MAX_PAGE_SIZE: int = int(os.getenv("ADMIN_MAX_PAGE_SIZE", "1000"))
+
+    # Сжатие ответов: минимальный размер тела и число сжатых тел,
+    # сохраняемых для повторных ответов
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_CACHE_SIZE: int = int(
+        os.getenv("COMPRESSION_CACHE_SIZE", "512")
+    )
+
+    # Схема БД при старте: verify — проверка ревизии alembic,
+    # create — create_all для разработки, off — без проверки
+    DB_SCHEMA_MODE: str = os.getenv("DB_SCHEMA_MODE", "verify")
+    ALEMBIC_SCRIPT_LOCATION: str = os.getenv(
+        "ALEMBIC_SCRIPT_LOCATION",
+        os.path.join(os.path.dirname(__file__), "alembic"),
+    )
+
+    # Лаунчер воркеров: 0 воркеров означает число CPU
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+    WORKER_MAX_REQUESTS: int = int(os.getenv("WORKER_MAX_REQUESTS", "1000"))
+    WORKER_MAX_REQUESTS_JITTER: int = int(
+        os.getenv("WORKER_MAX_REQUESTS_JITTER", "100")
+    )
+    WORKER_GRACEFUL_TIMEOUT: int = int(
+        os.getenv("WORKER_GRACEFUL_TIMEOUT", "30")
+    )
 
     class Config:
         env_file = os.path.join(
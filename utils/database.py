@@ -1,20 +1,202 @@
-from collections.abc import Generator
+import os
+import time
 
+from collections.abc import AsyncGenerator, Generator
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from utils.config import settings
+from utils.db_hooks import attach_db_hooks
+from utils.metrics import observe_pool_checkout, set_pool_status
+
+# Асинхронные драйверы для синхронных URL из настроек
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Преобразование URL базы данных в URL с асинхронным драйвером"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для '{backend}'")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url.render_as_string(hide_password=False)
+
+
+# Режимы подготовки схемы при старте сервиса
+SCHEMA_MODES = ("verify", "create", "off")
+
+
+class SchemaVersionError(RuntimeError):
+    """Ревизия схемы БД не совпадает с последней миграцией alembic"""
+
+
+def get_alembic_heads(script_location: str) -> set[str]:
+    """Последние ревизии миграций из каталога alembic"""
+    return set(ScriptDirectory(script_location).get_heads())
+
+
+class InstrumentedPoolMixin:
+    """Пул, который отдает в Prometheus время ожидания и состояние"""
+
+    metrics_label: str
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_pool_checkout(
+                self.metrics_label, time.perf_counter() - start
+            )
+            self._report_status()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report_status()
+
+    def _report_status(self):
+        set_pool_status(
+            self.metrics_label,
+            checked_out=self.checkedout(),
+            idle=self.checkedin(),
+            overflow=max(self.overflow(), 0),
+        )
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(
+    InstrumentedPoolMixin, AsyncAdaptedQueuePool
+):
+    metrics_label = "async"
 
 
 class Database:
-    def __init__(self, database_url: str, echo: bool = False):
-        self.engine = create_engine(database_url, echo=echo)
+    def __init__(
+        self,
+        database_url: str,
+        echo: bool = False,
+        pool_size: int = settings.DB_POOL_SIZE,
+        max_overflow: int = settings.DB_MAX_OVERFLOW,
+        pool_timeout: float = settings.DB_POOL_TIMEOUT,
+        pool_recycle: int = settings.DB_POOL_RECYCLE,
+        pool_pre_ping: bool = settings.DB_POOL_PRE_PING,
+    ):
+        pool_options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+        }
+        sync_options, async_options = {}, {}
+        # SQLite использует собственные пулы без ограничения размера
+        if make_url(database_url).get_backend_name() != "sqlite":
+            sync_options = {"poolclass": InstrumentedQueuePool}
+            async_options = {"poolclass": InstrumentedAsyncQueuePool}
+            sync_options.update(pool_options)
+            async_options.update(pool_options)
+
+        self.engine = create_engine(database_url, echo=echo, **sync_options)
+        self.async_engine = create_async_engine(
+            get_async_database_url(database_url), echo=echo, **async_options
+        )
+        attach_db_hooks(self.engine)
+        attach_db_hooks(self.async_engine.sync_engine)
+        self.async_session_maker = async_sessionmaker(
+            self.async_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Воркеры не должны использовать соединения родителя после fork
+        os.register_at_fork(after_in_child=self._forget_parent_connections)
+
+    def _forget_parent_connections(self):
+        self.engine.dispose(close=False)
+        self.async_engine.sync_engine.dispose(close=False)
 
     def create_db_and_tables(self):
         SQLModel.metadata.create_all(self.engine)
 
+    def get_schema_revisions(self) -> set[str]:
+        """Ревизии из alembic_version, пустое множество без миграций"""
+        with self.engine.connect() as connection:
+            try:
+                result = connection.execute(
+                    text("SELECT version_num FROM alembic_version")
+                )
+            except (OperationalError, ProgrammingError):
+                return set()
+            return set(result.scalars())
+
+    def verify_schema(self, script_location: str):
+        """Проверка, что БД мигрирована до последней ревизии"""
+        heads = get_alembic_heads(script_location)
+        current = self.get_schema_revisions()
+        if current != heads:
+            raise SchemaVersionError(
+                f"Схема БД на ревизии {sorted(current) or 'нет'}, "
+                f"ожидается {sorted(heads)}: выполните alembic upgrade head"
+            )
+
+    def prepare_schema(self, mode: str, script_location: str):
+        """Подготовка схемы при старте: проверка ревизии или create_all.
+
+        ``create`` создает таблицы по моделям и предназначен только для
+        разработки и тестов, схемой в остальных окружениях управляет alembic.
+        """
+        if mode == "verify":
+            self.verify_schema(script_location)
+        elif mode == "create":
+            self.create_db_and_tables()
+        elif mode != "off":
+            raise ValueError(
+                f"Неизвестный режим схемы '{mode}', ожидается {SCHEMA_MODES}"
+            )
+
     def get_session(self) -> Generator[Session, None, None]:
         with Session(self.engine) as session:
             yield session
 
+    async def get_async_session(self) -> AsyncGenerator[AsyncSession, None]:
+        async with self.async_session_maker() as session:
+            yield session
+
+    async def dispose(self):
+        await self.async_engine.dispose()
+        self.engine.dispose()
+
+
+_db = None
+
+
+def get_db() -> Database:
+    """Общая БД admin и application, создается при первом обращении.
+
+    Сервисы со своей БД (auth) импортируют ``Database`` и не создают
+    лишних движков и пулов для ``DATABASE_URL``.
+    """
+    global _db
+    if _db is None:
+        _db = Database(
+            database_url=settings.DATABASE_URL, echo=settings.ECHO_SQL
+        )
+    return _db
+
 
-db = Database(database_url=settings.DATABASE_URL, echo=settings.ECHO_SQL)
+def __getattr__(name: str):
+    # ``from utils.database import db`` создает БД только при импорте db
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,94 @@
+"""Автоматическая инструментация запросов к БД через события SQLAlchemy.
+
+Каждый запрос классифицируется по операции (select/insert/update/delete)
+и основной таблице и учитывается в ``DB_QUERY_COUNT``/``DB_QUERY_LATENCY``
+без кода в обработчиках. Для SELECT дополнительно учитывается число
+возвращенных строк по маршруту, чтобы находить обработчики, которые
+выбирают больше строк, чем отдают.
+"""
+
+import re
+import time
+
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+from utils.metrics import get_current_route, observe_db_query, observe_db_rows
+from utils.query_log import log_query
+
+OPERATIONS = ("select", "insert", "update", "delete")
+
+# Основная таблица для каждой операции
+TABLE_PATTERNS = {
+    "select": re.compile(r"\bFROM\s+((?:\"?\w+\"?\.)?\"?\w+\"?)", re.I),
+    "insert": re.compile(r"\bINTO\s+((?:\"?\w+\"?\.)?\"?\w+\"?)", re.I),
+    "update": re.compile(r"\bUPDATE\s+((?:\"?\w+\"?\.)?\"?\w+\"?)", re.I),
+    "delete": re.compile(r"\bFROM\s+((?:\"?\w+\"?\.)?\"?\w+\"?)", re.I),
+}
+
+# Основной оператор после блока WITH ... AS (...)
+CTE_BODY_PATTERN = re.compile(r"\)\s*(SELECT|INSERT|UPDATE|DELETE)\b", re.I)
+
+
+@lru_cache(maxsize=2048)
+def classify_statement(statement: str) -> tuple[str, str]:
+    """Определение операции и основной таблицы запроса.
+
+    Таблицы вне метаданных моделей (системные каталоги, алиасы CTE)
+    сводятся к ``other``, чтобы число меток оставалось ограниченным.
+    """
+    words = statement.lstrip().split(None, 1)
+    keyword = words[0].lower() if words else ""
+    body = statement
+
+    if keyword == "with":
+        match = CTE_BODY_PATTERN.search(statement)
+        if match is None:
+            return "other", "other"
+        keyword = match.group(1).lower()
+        body = statement[match.start(1):]
+
+    if keyword not in OPERATIONS:
+        return "other", "other"
+
+    match = TABLE_PATTERNS[keyword].search(body)
+    if match is None:
+        return keyword, "none"
+    table = match.group(1).replace('"', "").rsplit(".", 1)[-1].lower()
+    if table not in SQLModel.metadata.tables:
+        table = "other"
+    return keyword, table
+
+
+def before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    start = getattr(context, "_query_start_time", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+
+    operation, table = classify_statement(statement)
+    observe_db_query(operation, table, duration)
+
+    # rowcount для SELECT известен у psycopg2 и asyncpg, SQLite отдает -1
+    if operation == "select" and cursor.rowcount >= 0:
+        observe_db_rows(get_current_route() or "none", table, cursor.rowcount)
+
+    log_query(statement, parameters, executemany, duration, operation, table)
+
+
+def attach_db_hooks(engine: Engine):
+    """Подключение инструментации к синхронному движку SQLAlchemy"""
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,118 @@
+"""Запуск бэкенда в нескольких воркерах gunicorn с uvicorn-воркерами.
+
+Запуск из каталога сервиса:
+
+    python -m utils.launcher main:app --port 8000 --init main:init_service
+
+Приложение импортируется один раз в мастер-процессе (preload), там же
+выполняется разовая инициализация ``--init``, после чего воркеры
+запускаются через fork. По SIGTERM мастер перестает принимать соединения
+и ждет завершения текущих запросов до ``WORKER_GRACEFUL_TIMEOUT`` секунд.
+Воркер перезапускается после ``WORKER_MAX_REQUESTS`` запросов (со
+случайным разбросом), чтобы ограничить рост памяти.
+
+Метрики Prometheus собираются в режиме multiprocess: каталог
+``PROMETHEUS_MULTIPROC_DIR`` очищается при старте, а live-gauge файлы
+завершившихся воркеров удаляются сразу после их выхода. Переменная
+выставляется до импорта приложения, поэтому лаунчер нужно запускать
+как отдельный модуль, а не из ``main.py``.
+"""
+
+import argparse
+import importlib
+import os
+import shutil
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+
+from utils.config import settings
+from utils.lifecycle import MANAGED_ENV
+
+WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+
+def get_workers_count(configured: int) -> int:
+    """Число воркеров: из настроек или по числу CPU"""
+    return configured if configured > 0 else os.cpu_count() or 1
+
+
+def prepare_multiprocess_dir(path: str):
+    """Пустой каталог для файлов метрик всех воркеров сервиса"""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def import_callable(path: str):
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def on_starting(server):
+    if server.app.init_path:
+        import_callable(server.app.init_path)()
+
+
+def child_exit(server, worker):
+    # prometheus_client читает PROMETHEUS_MULTIPROC_DIR при импорте
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+class ServiceApplication(BaseApplication):
+    """Приложение gunicorn с настройками из командной строки"""
+
+    def __init__(self, app_path: str, init_path: str | None, options: dict):
+        self.app_path = app_path
+        self.init_path = init_path
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return import_app(self.app_path)
+
+
+def build_options(args) -> dict:
+    workers = args.workers or settings.WEB_CONCURRENCY
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": get_workers_count(workers),
+        "worker_class": WORKER_CLASS,
+        "preload_app": True,
+        "max_requests": settings.WORKER_MAX_REQUESTS,
+        "max_requests_jitter": settings.WORKER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.WORKER_GRACEFUL_TIMEOUT,
+        "on_starting": on_starting,
+        "child_exit": child_exit,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("app", help="Путь к приложению, например main:app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument(
+        "--init", help="Разовая инициализация до запуска воркеров"
+    )
+    args = parser.parse_args(argv)
+
+    multiprocess_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), f"prometheus-{args.port}"),
+    )
+    prepare_multiprocess_dir(multiprocess_dir)
+    os.environ[MANAGED_ENV] = "1"
+
+    ServiceApplication(args.app, args.init, build_options(args)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Задачи жизненного цикла, которые должны выполняться один раз на сервис.
+
+Под ``utils.launcher`` приложение работает в нескольких воркерах, и
+lifespan выполняется в каждом из них. Разовую инициализацию (схема БД)
+лаунчер выполняет в мастер-процессе до запуска воркеров, а фоновые задачи
+вроде polling Telegram-бота запускаются через ``run_singleton``: задачу
+выполняет воркер, захвативший файловую блокировку, остальные ждут и
+подхватывают ее, если этот воркер будет перезапущен.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import tempfile
+
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger("yoga.lifecycle")
+
+# Переменная окружения, которую лаунчер выставляет для своих воркеров
+MANAGED_ENV = "YOGA_MANAGED_WORKERS"
+
+SINGLETON_RETRY_SECONDS = 5.0
+
+
+def is_managed_worker() -> bool:
+    """Процесс запущен лаунчером, разовые задачи выполнил мастер"""
+    return os.environ.get(MANAGED_ENV) == "1"
+
+
+def try_lock(path: str):
+    """Неблокирующий захват файловой блокировки, None если она занята"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+async def run_singleton(
+    name: str,
+    task: Callable[[], Awaitable[None]],
+    lock_dir: str | None = None,
+):
+    """Выполнение задачи ровно в одном процессе сервиса.
+
+    Блокировка снимается ядром при завершении процесса, поэтому после
+    перезапуска воркера задачу подхватит другой воркер.
+    """
+    path = os.path.join(lock_dir or tempfile.gettempdir(), f"{name}.lock")
+    while (fd := try_lock(path)) is None:
+        await asyncio.sleep(SINGLETON_RETRY_SECONDS)
+
+    logger.info("Задача %s запущена в процессе %s", name, os.getpid())
+    try:
+        await task()
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
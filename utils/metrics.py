@@ -1,7 +1,23 @@
-from prometheus_client import Counter, Histogram, Gauge, Summary, start_http_server
-import time
-import threading
+import glob
 import os
+import threading
+import time
+
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    Summary,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
 
 # Метрики для HTTP-запросов
 REQUEST_COUNT = Counter(
@@ -14,7 +30,27 @@ REQUEST_LATENCY = Histogram(
     'http_request_duration_seconds', 
     'Время выполнения HTTP запросов',
     ['method', 'endpoint', 'service'],
-    buckets=(0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 25.0, 50.0, 75.0, float("inf"))
+    buckets=(
+        0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5,
+        10.0, 25.0, 50.0, 75.0, float("inf"),
+    )
+)
+
+HTTP_TIME_TO_FIRST_BYTE = Histogram(
+    'http_time_to_first_byte_seconds',
+    'Время до начала отправки ответа на HTTP запрос',
+    ['method', 'endpoint', 'service'],
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+        7.5, 10.0, float("inf"),
+    )
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'Количество HTTP запросов в обработке',
+    ['service'],
+    multiprocess_mode='livesum'
 )
 
 # Метрики для базы данных
@@ -28,89 +64,402 @@ DB_QUERY_LATENCY = Histogram(
     'db_query_duration_seconds', 
     'Время выполнения запросов к БД',
     ['operation', 'table', 'service'],
-    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, float("inf"))
+    buckets=(
+        0.001, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5,
+        5.0, float("inf"),
+    )
+)
+
+DB_ROWS_RETURNED = Histogram(
+    'db_query_rows_returned',
+    'Количество строк, возвращенных запросом к БД',
+    ['route', 'table', 'service'],
+    buckets=(
+        0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+        float("inf"),
+    )
+)
+
+# Метрики пула соединений с БД
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Количество соединений, выданных из пула',
+    ['pool', 'service'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_IDLE = Gauge(
+    'db_pool_idle_connections',
+    'Количество свободных соединений в пуле',
+    ['pool', 'service'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Количество соединений сверх размера пула',
+    ['pool', 'service'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Время ожидания соединения из пула',
+    ['pool', 'service'],
+    buckets=(
+        0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+        10.0, 30.0, float("inf"),
+    )
+)
+
+# Метрики кэша свободных слотов
+AVAILABILITY_CACHE_HITS = Counter(
+    'availability_cache_hits_total',
+    'Количество ответов из кэша свободных слотов',
+    ['kind', 'service']
+)
+
+AVAILABILITY_CACHE_MISSES = Counter(
+    'availability_cache_misses_total',
+    'Количество промахов кэша свободных слотов',
+    ['kind', 'service']
+)
+
+AVAILABILITY_CACHE_EVICTIONS = Counter(
+    'availability_cache_evictions_total',
+    'Количество вытесненных записей кэша свободных слотов',
+    ['reason', 'service']
+)
+
+AVAILABILITY_CACHE_ENTRIES = Gauge(
+    'availability_cache_entries',
+    'Количество записей в кэше свободных слотов',
+    ['service'],
+    multiprocess_mode='livesum'
 )
 
 # Метрики состояния приложения
 ACTIVE_USERS = Gauge(
     'app_active_users',
     'Количество активных пользователей',
-    ['service']
+    ['service'],
+    multiprocess_mode='livemax'
 )
 
 MEMORY_USAGE = Gauge(
     'app_memory_usage_bytes',
     'Использование памяти приложением',
-    ['service']
+    ['service'],
+    multiprocess_mode='livesum'
 )
 
+# ASGI scope текущего запроса: маршрут определяется роутером уже после
+# входа в middleware, поэтому он читается из scope по мере необходимости
+current_request_scope = ContextVar('current_request_scope', default=None)
+
+def bind_request_scope(scope):
+    """Привязка ASGI scope запроса к текущему контексту"""
+    current_request_scope.set(scope)
+
+def get_current_route():
+    """Шаблон маршрута текущего запроса или None вне запроса"""
+    scope = current_request_scope.get()
+    if scope is None:
+        return None
+    route = scope.get('route')
+    if route is None:
+        return None
+    return route.path
+
 # Получение имени сервиса из переменной окружения или имени хоста
 def get_service_name():
-    return os.environ.get('SERVICE_NAME', os.environ.get('HOSTNAME', 'unknown'))
+    return os.environ.get(
+        'SERVICE_NAME', os.environ.get('HOSTNAME', 'unknown')
+    )
+
+
+class HttpMetricsChildren:
+    """Заранее привязанные метрики одной пары (метод, маршрут)"""
+
+    __slots__ = (
+        'method', 'endpoint', 'service', 'latency', 'first_byte', 'counts'
+    )
+
+    def __init__(self, method, endpoint, service):
+        self.method = method
+        self.endpoint = endpoint
+        self.service = service
+        self.latency = REQUEST_LATENCY.labels(method, endpoint, service)
+        self.first_byte = HTTP_TIME_TO_FIRST_BYTE.labels(
+            method, endpoint, service
+        )
+        self.counts = {}
+
+    def count(self, status_code):
+        child = self.counts.get(status_code)
+        if child is None:
+            child = REQUEST_COUNT.labels(
+                self.method, self.endpoint, status_code, self.service
+            )
+            self.counts[status_code] = child
+        return child
+
+
+class MetricsRegistry:
+    """Кэш привязанных к меткам метрик для горячего пути запроса.
+
+    Имя сервиса определяется один раз при старте, а результаты
+    ``metric.labels(...)`` хранятся по кортежу меток, поэтому на каждый
+    запрос не создаются словари меток и не читается окружение. Найденная
+    метрика читается из словаря без блокировки, блокировка берется
+    только при промахе. При переполнении вытесняется самая старая
+    запись. Метка ``service`` всегда последняя и добавляется реестром.
+    """
+
+    def __init__(self, max_children=4096):
+        self.max_children = max_children
+        self._service = None
+        self._children = OrderedDict()
+        self._http_children = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_service_name()
+        return self._service
+
+    def set_service_name(self, name):
+        """Установка имени сервиса при старте приложения"""
+        os.environ['SERVICE_NAME'] = name
+        with self._lock:
+            self._service = name
+            self._children.clear()
+            self._http_children.clear()
+
+    def _add(self, cache, key, factory):
+        """Добавление дочерней метрики при промахе, под блокировкой"""
+        with self._lock:
+            child = cache.get(key)
+            if child is None:
+                child = factory()
+                cache[key] = child
+                if len(cache) > self.max_children:
+                    cache.popitem(last=False)
+        return child
+
+    def labels(self, metric, *label_values):
+        """Дочерняя метрика для значений меток без метки service"""
+        key = (metric, label_values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._add(
+                self._children,
+                key,
+                lambda: metric.labels(*label_values, self.service),
+            )
+        return child
+
+    def http(self, method, endpoint):
+        """Быстрый путь middleware: все метрики запроса одним поиском"""
+        key = (method, endpoint)
+        children = self._http_children.get(key)
+        if children is None:
+            children = self._add(
+                self._http_children,
+                key,
+                lambda: HttpMetricsChildren(method, endpoint, self.service),
+            )
+        return children
+
+
+metrics_registry = MetricsRegistry()
+
 
 # Класс-таймер для измерения времени выполнения операций
 class TimerContextManager:
-    def __init__(self, metric, labels):
-        self.metric = metric
-        self.labels = labels
-        
+    def __init__(self, child):
+        self.child = child
+
     def __enter__(self):
-        self.start = time.time()
+        self.start = time.perf_counter_ns()
         return self
-        
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duration = time.time() - self.start
-        self.metric.labels(*self.labels).observe(duration)
+        duration = (time.perf_counter_ns() - self.start) / 1e9
+        self.child.observe(duration)
 
 
 # Функции-хелперы для работы с метриками
 def track_request(method, endpoint, status_code):
     """Отслеживание HTTP-запроса"""
-    service = get_service_name()
-    REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status_code, service=service).inc()
+    metrics_registry.http(method, endpoint).count(status_code).inc()
 
 def time_request(method, endpoint):
     """Таймер для измерения времени выполнения HTTP-запроса"""
-    service = get_service_name()
-    return TimerContextManager(REQUEST_LATENCY, [method, endpoint, service])
+    return TimerContextManager(metrics_registry.http(method, endpoint).latency)
 
 def track_db_query(operation, table):
     """Отслеживание запроса к БД"""
-    service = get_service_name()
-    DB_QUERY_COUNT.labels(operation=operation, table=table, service=service).inc()
+    metrics_registry.labels(DB_QUERY_COUNT, operation, table).inc()
 
 def time_db_query(operation, table):
     """Таймер для измерения времени выполнения запроса к БД"""
-    service = get_service_name()
-    return TimerContextManager(DB_QUERY_LATENCY, [operation, table, service])
+    return TimerContextManager(
+        metrics_registry.labels(DB_QUERY_LATENCY, operation, table)
+    )
+
+def observe_db_query(operation, table, duration):
+    """Учет запроса к БД вместе с временем его выполнения"""
+    metrics_registry.labels(DB_QUERY_COUNT, operation, table).inc()
+    metrics_registry.labels(DB_QUERY_LATENCY, operation, table).observe(
+        duration
+    )
+
+def observe_db_rows(route, table, rows):
+    """Учет количества строк, возвращенных запросом к БД"""
+    metrics_registry.labels(DB_ROWS_RETURNED, route, table).observe(rows)
+
+def observe_pool_checkout(pool, wait_seconds):
+    """Учет времени ожидания соединения из пула"""
+    metrics_registry.labels(DB_POOL_CHECKOUT_WAIT, pool).observe(wait_seconds)
+
+def set_pool_status(pool, checked_out, idle, overflow):
+    """Обновление состояния пула соединений"""
+    metrics_registry.labels(DB_POOL_CHECKED_OUT, pool).set(checked_out)
+    metrics_registry.labels(DB_POOL_IDLE, pool).set(idle)
+    metrics_registry.labels(DB_POOL_OVERFLOW, pool).set(overflow)
 
 def set_active_users(count):
     """Установка значения активных пользователей"""
-    service = get_service_name()
-    ACTIVE_USERS.labels(service=service).set(count)
+    metrics_registry.labels(ACTIVE_USERS).set(count)
 
 def update_memory_usage(usage_bytes):
     """Обновление значения использования памяти"""
-    service = get_service_name()
-    MEMORY_USAGE.labels(service=service).set(usage_bytes)
+    metrics_registry.labels(MEMORY_USAGE).set(usage_bytes)
+
+def track_cache_lookup(kind, hit):
+    """Учет обращения к кэшу свободных слотов"""
+    metric = AVAILABILITY_CACHE_HITS if hit else AVAILABILITY_CACHE_MISSES
+    metrics_registry.labels(metric, kind).inc()
+
+def track_cache_evictions(reason, count=1):
+    """Учет вытеснения записей кэша: size, expired или invalidated"""
+    metrics_registry.labels(AVAILABILITY_CACHE_EVICTIONS, reason).inc(count)
 
-# Запуск HTTP-сервера для метрик Prometheus
-def start_metrics_server(port=8000):
-    """Запуск HTTP-сервера для метрик Prometheus"""
+def set_cache_entries(count):
+    """Обновление размера кэша свободных слотов"""
+    metrics_registry.labels(AVAILABILITY_CACHE_ENTRIES).set(count)
+
+# Значения меток для запросов вне известных маршрутов и методов
+UNMATCHED_ENDPOINT = '<unmatched>'
+KNOWN_METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+
+class PrometheusMiddleware:
+    """ASGI middleware для метрик HTTP-запросов.
+
+    Запросы размечаются шаблоном маршрута
+    (``/api/admin/trainer/{trainer_id}``), а не фактическим путем, поэтому
+    число временных рядов не зависит от количества идентификаторов в URL.
+    Время до первого байта и полное время ответа измеряются отдельно.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        bind_request_scope(scope)
+        method = scope['method']
+        if method not in KNOWN_METHODS:
+            method = 'OTHER'
+        start = time.perf_counter_ns()
+        status_code = 500
+        first_byte_at = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, first_byte_at
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                first_byte_at = time.perf_counter_ns()
+            await send(message)
+
+        in_progress = metrics_registry.labels(HTTP_REQUESTS_IN_PROGRESS)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished_at = time.perf_counter_ns()
+            in_progress.dec()
+
+            route = scope.get('route')
+            endpoint = route.path if route is not None else UNMATCHED_ENDPOINT
+            children = metrics_registry.http(method, endpoint)
+            children.count(status_code).inc()
+            children.latency.observe((finished_at - start) / 1e9)
+            if first_byte_at:
+                children.first_byte.observe((first_byte_at - start) / 1e9)
+
+# Каталог файлов метрик, общий для всех воркеров одного сервиса
+def get_multiprocess_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+def is_process_alive(pid):
+    """Проверка, что процесс с указанным pid еще существует"""
     try:
-        start_http_server(port)
-        print(f"Metrics server started on port {port}")
-    except Exception as e:
-        print(f"Failed to start metrics server: {e}")
-    
-# Функция для запуска HTTP-сервера в отдельном потоке
-def start_metrics_server_in_thread(port=8000):
-    """Запуск HTTP-сервера для метрик Prometheus в отдельном потоке"""
-    thread = threading.Thread(
-        target=start_metrics_server,
-        args=(port,),
-        daemon=True
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_dead_workers():
+    """Удаление live-gauge файлов завершившихся воркеров.
+
+    Счетчики и гистограммы мертвых воркеров остаются в каталоге, чтобы
+    суммарные значения не уменьшались после перезапуска воркера.
+    """
+    path = get_multiprocess_dir()
+    if not path:
+        return []
+    pids = set()
+    for filename in glob.glob(os.path.join(path, '*_*.db')):
+        pid = os.path.basename(filename)[:-3].rsplit('_', 1)[-1]
+        if pid.isdigit():
+            pids.add(int(pid))
+    dead = sorted(pid for pid in pids if not is_process_alive(pid))
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+    return dead
+
+
+_export_registry = None
+
+
+def get_export_registry():
+    """Реестр для экспорта: сумма по всем воркерам в multiprocess-режиме"""
+    global _export_registry
+    if _export_registry is None:
+        if get_multiprocess_dir():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            _export_registry = registry
+        else:
+            _export_registry = REGISTRY
+    return _export_registry
+
+
+async def metrics_endpoint(request):
+    """Отдача метрик Prometheus из самого приложения"""
+    return Response(
+        generate_latest(get_export_registry()),
+        media_type=CONTENT_TYPE_LATEST,
     )
-    thread.start()
-    print(f"Started metrics server thread on port {port}")
-    return thread 
\ No newline at end of file
@@ -7,12 +7,28 @@ from sqlmodel import Field, Relationship, SQLModel
 
 
 class Booking(SQLModel, table=True):
+    __table_args__ = (
+        # Бронирования на день и на день тренера
+        sa.Index("ix_booking_dates", "dates"),
+        sa.Index("ix_booking_trainer_id_dates", "trainer_id", "dates"),
+        sa.Index("ix_booking_timeslot_id", "timeslot_id"),
+    )
+
+    # Бронирование остается в истории после удаления слота и справочников
     id: int | None = Field(default=None, primary_key=True)
-    service_id: Optional[int] = Field(default=None)
-    class_id: Optional[int] = Field(default=None)
-    trainer_id: Optional[int] = Field(default=None)
-    timeslot_id: int = Field(nullable=False)
-    dates: str = Field(nullable=False)
+    service_id: Optional[int] = Field(
+        default=None, foreign_key="service.id", ondelete="SET NULL"
+    )
+    class_id: Optional[int] = Field(
+        default=None, foreign_key="groupclass.id", ondelete="SET NULL"
+    )
+    trainer_id: Optional[int] = Field(
+        default=None, foreign_key="trainer.id", ondelete="SET NULL"
+    )
+    timeslot_id: Optional[int] = Field(
+        default=None, foreign_key="timeslot.id", ondelete="SET NULL"
+    )
+    dates: date = Field(nullable=False)
     user_name: Optional[str] = Field(default=None)
     user_email: Optional[str] = Field(default=None)
     user_phone: Optional[str] = Field(default=None)
@@ -30,6 +46,48 @@ class TrainerGroup(SQLModel, table=True):
 
 
 class TimeSlot(SQLModel, table=True):
+    # Частичные индексы по свободным слотам под запросы записи
+    __table_args__ = (
+        sa.Index(
+            "ix_timeslot_trainer_date_service_available",
+            "trainer_id",
+            "dates",
+            "service_id",
+            postgresql_where=sa.text("available"),
+        ),
+        sa.Index(
+            "ix_timeslot_date_group_class_available",
+            "dates",
+            "group_class_id",
+            postgresql_where=sa.text("available"),
+        ),
+        sa.Index(
+            "ix_timeslot_service_date_available",
+            "service_id",
+            "dates",
+            postgresql_where=sa.text("available"),
+        ),
+        sa.Index(
+            "ix_timeslot_group_class_date_available",
+            "group_class_id",
+            "dates",
+            postgresql_where=sa.text("available"),
+        ),
+        # Порядок страниц списка слотов в админке
+        sa.Index("ix_timeslot_dates_times_id", "dates", "times", "id"),
+        # Один слот тренера на услугу или занятие в одно время, на нем
+        # основан ON CONFLICT DO NOTHING массового создания слотов
+        sa.Index(
+            "uq_timeslot_trainer_date_time_target",
+            "trainer_id",
+            "dates",
+            "times",
+            sa.text("coalesce(service_id, 0)"),
+            sa.text("coalesce(group_class_id, 0)"),
+            unique=True,
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     trainer_id: int = Field(foreign_key="trainer.id", nullable=False)
     service_id: Optional[int] = Field(default=None, foreign_key="service.id")
@@ -92,7 +150,7 @@ class Branch(SQLModel, table=True):
 
 class GroupClass(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    name: str = Field(nullable=False)
+    name: str = Field(nullable=False, index=True)
     duration: float | None = Field(default=None)
     description: str | None = Field(default=None)
     price: int | None = Field(default=None, index=True)
@@ -0,0 +1,130 @@
+"""Уведомления об изменениях данных между процессами через LISTEN/NOTIFY.
+
+Изменяющий данные запрос отправляет ``pg_notify`` в своей транзакции,
+поэтому уведомление доставляется только после фиксации. Каждый процесс,
+которому нужны уведомления, держит отдельное соединение asyncpg вне пула
+с ``LISTEN`` на нужных каналах. Уведомления, отправленные, пока
+соединения нет, теряются, поэтому после подписки и после потери
+соединения вызывается ``on_reset`` — процесс должен сбросить все, что
+зависит от пропущенных уведомлений.
+
+При старте процесс подписывается через ``start_listener`` до того, как
+строит кэши: первая подписка ничего не сбрасывает, а изменение,
+пришедшее во время построения, сбросит свою часть кэша уведомлением.
+"""
+
+import asyncio
+import logging
+
+from collections.abc import Callable, Iterable
+
+import asyncpg
+
+from sqlalchemy import Text, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger("yoga.notifications")
+
+LISTEN_RETRY_SECONDS = 5.0
+
+# Наибольшее ожидание первой подписки при старте процесса
+LISTEN_START_TIMEOUT = 5.0
+
+# Все уведомления транзакции отправляются одним запросом
+NOTIFY_QUERY = text(
+    "SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload"
+).bindparams(bindparam("payloads", type_=ARRAY(Text)))
+
+
+async def notify(session, channel: str, payloads: Iterable[str]):
+    """Отправка уведомлений в текущей транзакции, только в PostgreSQL"""
+    if session.bind.dialect.name != "postgresql":
+        return
+    payloads = list(dict.fromkeys(payloads))
+    if payloads:
+        await session.exec(
+            NOTIFY_QUERY, params={"channel": channel, "payloads": payloads}
+        )
+
+
+def get_listen_dsn(database_url: str) -> str | None:
+    """DSN для asyncpg или None, если БД не PostgreSQL"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        return None
+    url = url.set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def listen(
+    database_url: str,
+    handlers: dict[str, Callable[[str], None]],
+    on_reset: Callable[[], None],
+    started: asyncio.Event | None = None,
+):
+    """Вызов ``handlers[channel](payload)`` на каждое уведомление.
+
+    Пока ``started`` не установлено, подписка устанавливает его вместо
+    вызова ``on_reset``.
+    """
+    dsn = get_listen_dsn(database_url)
+    if dsn is None:
+        if started is not None:
+            started.set()
+        return
+
+    def on_notification(connection, pid, channel, payload):
+        try:
+            handlers[channel](payload)
+        except Exception:
+            logger.exception("Ошибка обработки уведомления %s", channel)
+            on_reset()
+
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+        except (OSError, asyncpg.PostgresError) as error:
+            logger.warning("Нет соединения для LISTEN: %s", error)
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
+            continue
+
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            for channel in handlers:
+                await connection.add_listener(channel, on_notification)
+            if started is not None and not started.is_set():
+                started.set()
+            else:
+                # Изменения до подписки не были получены
+                on_reset()
+            await closed.wait()
+        except (OSError, asyncpg.PostgresError) as error:
+            logger.warning("Соединение для LISTEN потеряно: %s", error)
+        finally:
+            connection.terminate()
+        on_reset()
+        await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+
+async def start_listener(
+    database_url: str,
+    handlers: dict[str, Callable[[str], None]],
+    on_reset: Callable[[], None],
+) -> asyncio.Task:
+    """Задача ``listen``, запущенная и подписанная на каналы.
+
+    Если подписаться за ``LISTEN_START_TIMEOUT`` не удалось, задача
+    продолжает попытки, а подписка после этого вызовет ``on_reset``.
+    """
+    started = asyncio.Event()
+    task = asyncio.create_task(
+        listen(database_url, handlers, on_reset, started)
+    )
+    try:
+        await asyncio.wait_for(started.wait(), LISTEN_START_TIMEOUT)
+    except TimeoutError:
+        logger.warning("Подписка на уведомления при старте не удалась")
+        started.set()
+    return task
@@ -0,0 +1,69 @@
+"""Журнал запросов к БД вместо построчного echo SQLAlchemy.
+
+В лог попадают запросы медленнее ``SLOW_QUERY_THRESHOLD_MS`` и случайная
+выборка остальных с долей ``QUERY_LOG_SAMPLE_RATE``. Вместо значений
+параметров пишутся только их типы, а также маршрут, из которого был
+выполнен запрос. Время запросов измеряется в ``utils.db_hooks``.
+"""
+
+import logging
+import random
+
+from utils.config import settings
+from utils.metrics import get_current_route
+
+logger = logging.getLogger("yoga.sql")
+
+MAX_STATEMENT_LENGTH = 2000
+
+
+def describe_value(value) -> str:
+    if isinstance(value, list | tuple):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def describe_parameters(parameters, executemany: bool):
+    """Форма параметров запроса: типы без значений"""
+    if executemany:
+        if not parameters:
+            return []
+        shape = describe_parameters(parameters[0], False)
+        return f"{len(parameters)}x{shape}"
+    if isinstance(parameters, dict):
+        return {key: describe_value(val) for key, val in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        return [describe_value(value) for value in parameters]
+    return describe_value(parameters)
+
+
+def log_query(
+    statement: str,
+    parameters,
+    executemany: bool,
+    duration: float,
+    operation: str,
+    table: str,
+):
+    """Запись медленного или попавшего в выборку запроса в журнал"""
+    duration_ms = duration * 1000
+    is_slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+    if not is_slow and random.random() >= settings.QUERY_LOG_SAMPLE_RATE:
+        return
+
+    route = get_current_route()
+    logger.log(
+        logging.WARNING if is_slow else logging.INFO,
+        "%s запрос к БД %.1f мс [%s] %s params=%s",
+        "Медленный" if is_slow else "Выборочный",
+        duration_ms,
+        route or "-",
+        statement[:MAX_STATEMENT_LENGTH],
+        describe_parameters(parameters, executemany),
+        extra={
+            "duration_ms": round(duration_ms, 2),
+            "route": route,
+            "operation": operation,
+            "table": table,
+        },
+    )
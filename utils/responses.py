@@ -0,0 +1,37 @@
+"""Сериализация ответов в JSON через orjson.
+
+``ORJSONResponse`` — класс ответа по умолчанию во всех сервисах. Эндпоинты
+с горячими путями сериализуют строки запроса сами (``dumps``) и отдают
+готовые байты через ``json_response``: так ответ не проходит через
+``jsonable_encoder`` FastAPI, а сериализованное тело можно хранить в
+кэше. Даты и время кодируются в ISO 8601, как и ``jsonable_encoder``;
+остальные типы, которых нет в orjson (модели, ``Decimal``), передаются
+в ``jsonable_encoder``.
+"""
+
+import orjson
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response
+
+# Ключи словарей могут быть числами (id в нормализованных ответах)
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=jsonable_encoder, option=JSON_OPTIONS)
+
+
+def rows_to_json(rows) -> bytes:
+    """Строки запроса с колонками в массив JSON-объектов"""
+    return dumps([row._asdict() for row in rows])
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(body: bytes, **kwargs) -> Response:
+    """Ответ уже сериализованным JSON"""
+    return Response(body, media_type="application/json", **kwargs)